@@ -0,0 +1,248 @@
+#!/usr/bin/python2
+"""
+Exact expectations for the DAO's token and reward accounting.
+
+Every function mirrors the arithmetic of the contract in wei, including the
+truncation of its integer divisions, and works on whole lists of token
+holders at once. Python's integers are used rather than fixed width arrays
+since products such as `balance * rewardToken` easily overflow 64 bits.
+
+Wei values are reported by the scripts as decimal strings, since they do not
+fit in a javascript number, and `wei_strings()` turns expectations into the
+same form.
+"""
+
+WEI_PER_ETHER = 10 ** 18
+
+
+def to_wei(ether):
+    """Equivalent of web3.toWei() for a whole number of ether"""
+    return int(ether) * WEI_PER_ETHER
+
+
+def wei_strings(values):
+    """Return wei values, or a list of them, as reported by the scripts"""
+    if isinstance(values, list):
+        return [str(v) for v in values]
+    return str(values)
+
+
+def shares(balances, numerator, denominator):
+    """
+    The `balance * numerator / denominator` of each balance, truncated as
+    the contract's uint division does
+        Parameters
+        ----------
+        balances : array of ints
+        Token balances in wei
+
+        numerator : int
+        The amount shared out, e.g. the DAO's reward tokens
+
+        denominator : int
+        The amount the balances are a portion of, e.g. the total supply
+
+        Returns
+        ----------
+        shares : array of ints
+        The share of each balance
+    """
+    return [b * numerator // denominator for b in balances]
+
+
+def tally_votes(balances, votes):
+    """
+    Return the (yea, nay) sums of the balances of the token holders that
+    voted for and against, like `vote()` adds them up
+    """
+    yea = sum(b for b, v in zip(balances, votes) if v)
+    return yea, sum(balances) - yea
+
+
+def rewards_for(
+        balances,
+        dao_reward_token,
+        total_supply,
+        accumulated_input,
+        total_reward_token,
+        reward_tokens=None,
+        paid_out=None):
+    """
+    Rewards paid out by `withdrawRewardFor()` to each of the holders of
+    `balances`
+        Parameters
+        ----------
+        balances : array of ints
+        Token balance of each holder in wei
+
+        dao_reward_token : int
+        The reward tokens of the DAO itself, `rewardToken[address(this)]`
+
+        total_supply : int
+        The DAO's total supply of tokens in wei
+
+        accumulated_input : int
+        All wei ever sent to the reward account
+
+        total_reward_token : int
+        `totalRewardToken` of the DAO
+
+        reward_tokens : array of ints
+        Reward tokens held by each holder directly. Zero if not given.
+
+        paid_out : array of ints
+        Rewards already paid out to each holder. Zero if not given.
+
+        Returns
+        ----------
+        rewards : array of ints
+        The reward in wei each holder gets
+    """
+    count = len(balances)
+    reward_tokens = reward_tokens or [0] * count
+    paid_out = paid_out or [0] * count
+    portions = shares(balances, dao_reward_token, total_supply)
+    return [
+        (portion + own) * accumulated_input // total_reward_token - paid
+        for portion, own, paid in zip(portions, reward_tokens, paid_out)
+    ]
+
+
+def split_dao(votes, balances, split_balance, dao_reward_token):
+    """
+    State of the old and the new DAO after every holder who voted for a
+    split proposal has called `splitDAO()`. The contract moves funds and
+    reward tokens in proportion to the split data recorded by the first
+    call, so the order of the calls does not matter.
+        Parameters
+        ----------
+        votes : array of booleans
+        The votes array of what each user voted
+
+        balances : array of ints
+        Token balance of each holder in wei before the split
+
+        split_balance : int
+        The DAO's balance in wei when the split was first executed
+
+        dao_reward_token : int
+        The reward tokens of the DAO when the split was first executed
+
+        Returns
+        ----------
+        old_balances : array of ints
+        Token balance of each holder left in the old DAO
+
+        new_balances : array of ints
+        Token balance of each holder in the new DAO, which sells tokens at
+        1:1 to the funds moved to it
+
+        old_reward_token : int
+        Reward tokens left to the old DAO
+
+        new_reward_token : int
+        Reward tokens moved to the new DAO
+    """
+    total_supply = sum(balances)
+    funds = shares(balances, split_balance, total_supply)
+    moved = shares(balances, dao_reward_token, total_supply)
+    old_balances = [0 if v else b for b, v in zip(balances, votes)]
+    new_balances = [f if v else 0 for f, v in zip(funds, votes)]
+    new_reward_token = sum(m for m, v in zip(moved, votes) if v)
+    return (
+        old_balances,
+        new_balances,
+        dao_reward_token - new_reward_token,
+        new_reward_token
+    )
+
+
+def withdraw_rewards(
+        balances,
+        paid_out,
+        withdrawers,
+        dao_reward_token,
+        total_supply,
+        accumulated_input,
+        total_reward_token):
+    """
+    `paidOut` of every holder after the holders of `withdrawers` have each
+    called `getMyReward()` once. A reward below zero wraps around in the
+    contract's uint arithmetic, and like a reward larger than what is left
+    in the reward account its payout fails, so such calls pay nothing.
+        Parameters
+        ----------
+        balances : array of ints
+        Token balance of each holder in wei
+
+        paid_out : array of ints
+        Rewards already paid out to each holder
+
+        withdrawers : array of ints
+        Indexes of the holders that withdraw
+
+        Other parameters are as in `rewards_for()`, with `accumulated_input`
+        including everything the reward account ever received.
+
+        Returns
+        ----------
+        paid_out : array of ints
+        Rewards paid out to each holder after the withdrawals
+
+        failed : array of ints
+        Indexes of the holders whose withdrawal failed
+    """
+    paid_out = list(paid_out)
+    available = accumulated_input - sum(paid_out)
+    rewards = rewards_for(
+        [balances[i] for i in withdrawers],
+        dao_reward_token,
+        total_supply,
+        accumulated_input,
+        total_reward_token,
+        paid_out=[paid_out[i] for i in withdrawers]
+    )
+    failed = []
+    for i, reward in zip(withdrawers, rewards):
+        if reward < 0 or reward > available:
+            failed.append(i)
+            continue
+        paid_out[i] += reward
+        available -= reward
+    return paid_out, failed
+
+
+def transfer_tokens(balances, paid_out, transfers):
+    """
+    Token balances and `paidOut` of every holder after a list of transfers,
+    each moving the share of the sender's `paidOut` that `transferPaidOut()`
+    moves along with the tokens
+        Parameters
+        ----------
+        balances : array of ints
+        Token balance of each holder in wei
+
+        paid_out : array of ints
+        Rewards already paid out to each holder
+
+        transfers : array of (int, int, int) tuples
+        The sender index, receiver index and value in wei of each transfer,
+        in the order they are applied
+
+        Returns
+        ----------
+        balances : array of ints
+        Token balance of each holder after the transfers
+
+        paid_out : array of ints
+        `paidOut` of each holder after the transfers
+    """
+    balances = list(balances)
+    paid_out = list(paid_out)
+    for sender, receiver, value in transfers:
+        moved = paid_out[sender] * value // balances[sender]
+        paid_out[sender] -= moved
+        paid_out[receiver] += moved
+        balances[sender] -= value
+        balances[receiver] += value
+    return balances, paid_out
@@ -2,6 +2,24 @@
 import argparse
 import sys
 
+SCENARIOS = [
+    'none',
+    'deploy',
+    'fund',
+    'proposal',
+    'rewards',
+    'split',
+    'split-insufficient-gas',
+    'proposals-load',
+    'split-load',
+    'rewards-load',
+    'transfers-load'
+]
+# load scenarios measure how a real node copes, so they only run on geth
+GETH_ONLY_SCENARIOS = [
+    'proposals-load', 'split-load', 'rewards-load', 'transfers-load'
+]
+
 
 def test_args():
     """ Parse the test arguments and create and return the arguments object"""
@@ -22,6 +40,24 @@ def test_args():
             'contracts will not be removed'
         )
     )
+    p.add_argument(
+        '--no-compile-cache',
+        action='store_true',
+        help=(
+            'If given then solc is always invoked, bypassing the artifact '
+            'cache'
+        )
+    )
+    p.add_argument(
+        '--compile-cache-dir',
+        help='Directory of the solc artifact cache. Defaults to tests/cache'
+    )
+    p.add_argument(
+        '--compile-cache-size',
+        type=int,
+        help='Maximum size in MB of the solc artifact cache',
+        default=50
+    )
     p.add_argument(
         '--clean-chain',
         action='store_true',
@@ -30,6 +66,44 @@ def test_args():
             'test scenario is executed'
         )
     )
+    p.add_argument(
+        '--backend',
+        choices=['geth', 'tester'],
+        default='geth',
+        help=(
+            'Chain to run the scenarios on. The tester backend is an '
+            'in-process EVM (needs pyethereum) whose block time is advanced '
+            'by the framework, so sale and debating periods cost no time'
+        )
+    )
+    p.add_argument(
+        '--rpc-port',
+        type=int,
+        help='Local HTTP-RPC port of the geth node the scenarios attach to',
+        default=8545
+    )
+    p.add_argument(
+        '--checkpoint',
+        action='store_true',
+        help=(
+            'If given then a named checkpoint of the chain and of the '
+            'framework state is saved after each scenario'
+        )
+    )
+    p.add_argument(
+        '--from-checkpoint',
+        help=(
+            'Name of a checkpoint (e.g. rewards) to fork the chain from '
+            'instead of replaying all the scenarios leading to it'
+        )
+    )
+    p.add_argument(
+        '--checkpoint-dir',
+        help=(
+            'Directory where checkpoints are kept. Defaults to '
+            'tests/checkpoints'
+        )
+    )
     p.add_argument(
         '--verbose',
         action='store_true',
@@ -77,6 +151,99 @@ def test_args():
         'Should be at least 3',
         default=5
     )
+    p.add_argument(
+        '--confirm-timeout',
+        type=int,
+        help=(
+            'Seconds to keep mining for the receipts of the transactions a '
+            'scenario submitted before declaring them lost'
+        ),
+        default=120
+    )
+    p.add_argument(
+        '--timings',
+        help=(
+            'Print how long each phase of the run took and write the '
+            'individual phase timings as json to this file'
+        )
+    )
+    p.add_argument(
+        '--gas-profile',
+        help=(
+            'Record the gas used by every contract function call and write '
+            'min/mean/max per function and number of users to this file, as '
+            'csv if it ends in .csv and as json otherwise. An existing json '
+            'report is updated in place'
+        )
+    )
+    p.add_argument(
+        '--gas-baseline',
+        help=(
+            'A json gas profile to compare the run against. Fails if the mean '
+            'gas of any function grew by more than --gas-threshold percent'
+        )
+    )
+    p.add_argument(
+        '--gas-threshold',
+        type=float,
+        help='Allowed percentage of gas increase against --gas-baseline',
+        default=5.0
+    )
+    p.add_argument(
+        '--genesis-profile',
+        help=(
+            'Genesis block parameters to create new chains with. Either the '
+            'name of a built-in profile (default, large) or a json file with '
+            'any of gas_limit, difficulty, balance and config overriding the '
+            'default profile'
+        ),
+        default='default'
+    )
+    p.add_argument(
+        '--mining',
+        choices=['ethash', 'instant'],
+        default='ethash',
+        help=(
+            'How blocks are produced on new chains. ethash mines with a proof '
+            'of work, which needs the ethash DAG to be generated first. '
+            'instant creates a clique chain on which a block is sealed as '
+            'soon as transactions are pending. instant needs a geth version '
+            'with clique support'
+        )
+    )
+    p.add_argument(
+        '--throughput',
+        help=(
+            'A json report written by --gas-profile. The gas of each kind of '
+            'transaction is sized from the measured usage and the block gas '
+            'limit is raised so that the transactions of all users fit in '
+            'one block'
+        )
+    )
+    p.add_argument(
+        '--gas-headroom',
+        type=float,
+        help='Percentage added to the measured gas in --throughput mode',
+        default=20.0
+    )
+    p.add_argument(
+        '--watchdog',
+        type=int,
+        help=(
+            'Seconds a script may go without any output before the geth node '
+            'is killed and the run fails. Phases announced by the scripts, '
+            'such as waiting for a debating period, extend this deadline'
+        ),
+        default=300
+    )
+    p.add_argument(
+        '--accounts-seed',
+        help=(
+            'Derive the user accounts deterministically from this seed and '
+            'write their keystores directly, instead of creating them one by '
+            'one with geth. Needs pyethereum'
+        )
+    )
     p.add_argument(
         '--total-rewards',
         type=int,
@@ -84,25 +251,265 @@ def test_args():
         ' for the rewards scenario.',
         default=78
     )
+    p.add_argument(
+        '--split-gas',
+        type=int,
+        help=(
+            'Gas each user sends the splitDAO() call of the split scenario '
+            'with'
+        ),
+        default=4000000
+    )
+    p.add_argument(
+        '--proposals-num',
+        type=int,
+        help=(
+            'Number of proposals the proposals-load scenario keeps open at '
+            'once'
+        ),
+        default=50
+    )
+    p.add_argument(
+        '--load-debate-secs',
+        type=int,
+        help=(
+            'Shortest debating period of the proposals of the proposals-load '
+            'scenario. The periods are spread up to twice this, which has to '
+            'leave time for all votes to be included'
+        ),
+        default=60
+    )
+    p.add_argument(
+        '--split-proposals',
+        type=int,
+        help=(
+            'Number of split proposals the split-load scenario creates in '
+            'every DAO it splits'
+        ),
+        default=2
+    )
+    p.add_argument(
+        '--split-levels',
+        type=int,
+        help=(
+            'Levels of splits of the split-load scenario. Above 1 the DAOs '
+            'created by a split are split again, which needs --child-sale-secs'
+        ),
+        default=1
+    )
+    p.add_argument(
+        '--child-sale-secs',
+        type=int,
+        help=(
+            'Compile the DAO so that the token sale of a DAO created by a '
+            'split ends after this many seconds instead of 42 days, so that '
+            'it can take proposals during the run. It has to leave enough '
+            'time for all voters of a split to join the new DAO'
+        )
+    )
+    p.add_argument(
+        '--reward-rounds',
+        type=int,
+        help=(
+            'Number of donations to the reward account the rewards-load '
+            'scenario makes, each followed by withdrawals and transfers'
+        ),
+        default=5
+    )
+    p.add_argument(
+        '--max-donation',
+        type=int,
+        help=(
+            'Largest amount of ether a single donation of the rewards-load '
+            'scenario to the reward account can be'
+        ),
+        default=78
+    )
+    p.add_argument(
+        '--transfer-batches',
+        type=int,
+        help=(
+            'Number of back to back batches of transfers the transfers-load '
+            'scenario sends, each from half of the holders'
+        ),
+        default=10
+    )
+    p.add_argument(
+        '--load-report',
+        help=(
+            'Write the gas, latency and blocks until inclusion of every kind '
+            'of call made by a load scenario to this json file, keyed by '
+            'scenario and scale. An existing report is updated in place'
+        )
+    )
+    p.add_argument(
+        '--event-index',
+        help=(
+            'Index the events of the chain into this SQLite file after every '
+            'scenario on geth, and answer the results the index can answer '
+            'from it instead of with a contract call per holder. Use :memory: '
+            'for an index kept only during the run'
+        )
+    )
+    p.add_argument(
+        '--seed',
+        type=int,
+        help=(
+            'Seed of the random token distribution, votes and amounts of the '
+            'scenarios. A random seed is picked and printed if not given, so '
+            'that a run can be reproduced. With --fuzz it seeds the '
+            'configurations that are generated'
+        )
+    )
+    p.add_argument(
+        '--fuzz',
+        type=int,
+        help=(
+            'Number of random configurations (users, token distribution, '
+            'votes, deposit, rewards, split gas) of --scenario to play out, '
+            'up to --jobs of them at the same time'
+        )
+    )
+    p.add_argument(
+        '--fuzz-failures',
+        help='File to write the seeds of the failed --fuzz configurations to',
+        default='fuzz-failures.json'
+    )
+    p.add_argument(
+        '--fuzz-replay',
+        type=int,
+        help=(
+            'Seed of a --fuzz configuration to play out again, exactly as it '
+            'was fuzzed'
+        )
+    )
     p.add_argument(
         '--scenario',
-        choices=[
-            'none',
-            'deploy',
-            'fund',
-            'proposal',
-            'rewards',
-            'split',
-            'split-insufficient-gas'
-        ],
+        choices=SCENARIOS,
         default='none',
         help='Test scenario to play out'
     )
+    p.add_argument(
+        '--scenarios',
+        help=(
+            'Comma separated list of scenarios to play out in parallel, each '
+            'in its own process with a private datadir, work directory, '
+            'network id and ports'
+        )
+    )
+    p.add_argument(
+        '--jobs',
+        type=int,
+        help='Number of scenarios to run concurrently with --scenarios',
+        default=1
+    )
+    p.add_argument(
+        '--work-dir',
+        help=(
+            'Directory for the files generated during a run (scripts, '
+            'genesis block, edited contracts). Defaults to the current one'
+        )
+    )
+    p.add_argument(
+        '--data-dir',
+        help='Data directory of the geth node. Defaults to tests/data'
+    )
+    p.add_argument(
+        '--network-id',
+        type=int,
+        help='Network id of the test chain',
+        default=123
+    )
+    p.add_argument(
+        '--port',
+        type=int,
+        help='P2P listening port of the geth node',
+        default=30303
+    )
     args = p.parse_args()
 
     # Argument verification
     if args.users_num < 3:
         print("ERROR: Tests need 3 or more users")
         sys.exit(1)
+    if args.backend == 'tester' and args.mining != 'ethash':
+        print("ERROR: --mining only applies to the geth backend")
+        sys.exit(1)
+    if args.backend == 'tester' and (args.checkpoint or args.from_checkpoint):
+        print("ERROR: Checkpoints are only supported by the geth backend")
+        sys.exit(1)
+    scenarios = args.scenarios.split(',') if args.scenarios else []
+    for scenario in scenarios:
+        if scenario not in SCENARIOS:
+            print("ERROR: Unknown scenario '{}'".format(scenario))
+            sys.exit(1)
+    if args.backend == 'tester':
+        for scenario in scenarios + [args.scenario]:
+            if scenario in GETH_ONLY_SCENARIOS:
+                print("ERROR: Scenario '{}' needs the geth backend".format(
+                    scenario
+                ))
+                sys.exit(1)
+    if args.proposals_num < 1 or args.load_debate_secs < 1:
+        print("ERROR: --proposals-num and --load-debate-secs should be at "
+              "least 1")
+        sys.exit(1)
+    if args.split_proposals < 1 or args.split_levels < 1:
+        print("ERROR: --split-proposals and --split-levels should be at "
+              "least 1")
+        sys.exit(1)
+    if args.split_levels > 1 and not args.child_sale_secs:
+        print("ERROR: More than one --split-levels needs --child-sale-secs")
+        sys.exit(1)
+    if args.reward_rounds < 1 or args.transfer_batches < 1:
+        print("ERROR: --reward-rounds and --transfer-batches should be at "
+              "least 1")
+        sys.exit(1)
+    if args.max_donation < 1:
+        print("ERROR: --max-donation should be at least 1")
+        sys.exit(1)
+    if args.child_sale_secs and args.keep_limits:
+        # the token price of the last two weeks of a sale would apply
+        print("ERROR: --child-sale-secs can not be combined with "
+              "--keep-limits")
+        sys.exit(1)
+    if args.load_report and args.scenarios:
+        print("ERROR: --load-report can't be combined with --scenarios")
+        sys.exit(1)
+    if args.event_index and args.backend == 'tester':
+        print("ERROR: --event-index needs the geth backend")
+        sys.exit(1)
+    if args.event_index not in (None, ':memory:') and (
+            args.scenarios or args.fuzz):
+        # runs at the same time would each index their own chain into it
+        print("ERROR: Only --event-index :memory: can be combined with "
+              "--scenarios or --fuzz")
+        sys.exit(1)
+    if args.jobs < 1:
+        print("ERROR: --jobs should be at least 1")
+        sys.exit(1)
+    if args.gas_baseline and not args.gas_profile:
+        print("ERROR: --gas-baseline needs --gas-profile")
+        sys.exit(1)
+    if args.gas_profile and args.scenarios:
+        print("ERROR: --gas-profile can't be combined with --scenarios")
+        sys.exit(1)
+    if args.fuzz is not None:
+        if args.fuzz < 1:
+            print("ERROR: --fuzz should be at least 1")
+            sys.exit(1)
+        if args.scenarios or args.fuzz_replay is not None:
+            print("ERROR: --fuzz can't be combined with --scenarios or "
+                  "--fuzz-replay")
+            sys.exit(1)
+        if args.scenario == 'none':
+            print("ERROR: --fuzz needs a --scenario to fuzz")
+            sys.exit(1)
+    if args.fuzz_replay is not None and args.seed is not None:
+        print("ERROR: --fuzz-replay sets the seed itself")
+        sys.exit(1)
+    if args.from_checkpoint and args.clean_chain:
+        print("ERROR: --from-checkpoint can't be combined with --clean-chain")
+        sys.exit(1)
 
     return args
@@ -0,0 +1,160 @@
+#!/usr/bin/python2
+
+# Run a matrix of scenarios and numbers of users several times and report
+# the distribution of the wall time of each run and of each of its phases.
+# Any argument not known to this script is passed on to test.py, e.g.
+# ./benchmark.py --repeat 5 --backend tester
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+from timing import percentile
+
+TEST_PY = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'test.py')
+DEFAULT_SCENARIOS = 'deploy,fund,proposal,split'
+DEFAULT_USERS_NUMS = '5,20,50'
+PERCENTILES = [50, 90, 95]
+
+
+def benchmark_args():
+    p = argparse.ArgumentParser(description='DAO test harness benchmark')
+    p.add_argument(
+        '--scenarios',
+        help='Comma separated list of scenarios to benchmark',
+        default=DEFAULT_SCENARIOS
+    )
+    p.add_argument(
+        '--users-nums',
+        help='Comma separated list of numbers of users to benchmark with',
+        default=DEFAULT_USERS_NUMS
+    )
+    p.add_argument(
+        '--repeat',
+        type=int,
+        help='Number of times to run each combination',
+        default=3
+    )
+    p.add_argument(
+        '--output',
+        help='File to write the json results to',
+        default='benchmark.json'
+    )
+    args, test_argv = p.parse_known_args()
+    if args.repeat < 1:
+        print("ERROR: --repeat should be at least 1")
+        sys.exit(1)
+    return args, test_argv
+
+
+def run_once(scenario, users_num, test_argv):
+    """
+    Play out a scenario on a clean chain in its own directory and return
+    the timings it recorded, or None if it failed
+    """
+    work_dir = tempfile.mkdtemp(prefix='dao-bench-')
+    timings_file = os.path.join(work_dir, 'timings.json')
+    argv = [sys.executable, TEST_PY] + test_argv + [
+        '--clean-chain',
+        '--scenario', scenario,
+        '--users-num', str(users_num),
+        '--work-dir', work_dir,
+        '--data-dir', os.path.join(work_dir, 'data'),
+        '--timings', timings_file
+    ]
+    with open(os.path.join(work_dir, 'output.log'), 'w') as log:
+        code = subprocess.call(
+            argv, stdout=log, stderr=subprocess.STDOUT, cwd=work_dir
+        )
+    if code != 0:
+        print("ERROR: '{}' with {} users failed. Output is kept in {}".format(
+            scenario, users_num, work_dir
+        ))
+        return None
+    with open(timings_file, 'r') as f:
+        timings = json.loads(f.read())
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return timings
+
+
+def phase_totals(timings):
+    totals = {'total': timings['total_secs']}
+    for record in timings['phases']:
+        totals[record['phase']] = (
+            totals.get(record['phase'], 0.0) + record['secs']
+        )
+        if record.get('blocks') is not None:
+            name = record['phase'] + '_blocks'
+            totals[name] = totals.get(name, 0) + record['blocks']
+    return totals
+
+
+def stats(values):
+    result = {'min': min(values), 'max': max(values)}
+    for pct in PERCENTILES:
+        result['p{}'.format(pct)] = percentile(values, pct)
+    return result
+
+
+def summarize(runs):
+    """Return the stats of every phase over a list of runs' timings"""
+    samples = {}
+    for timings in runs:
+        for phase, secs in phase_totals(timings).iteritems():
+            samples.setdefault(phase, []).append(secs)
+    return dict((phase, stats(v)) for phase, v in samples.iteritems())
+
+
+def print_summary(results):
+    print("\n{:<24} {:>6} {:<14} {:>9} {:>9} {:>9}".format(
+        "Scenario", "Users", "Phase", "p50", "p90", "p95"
+    ))
+    for entry in results:
+        summary = entry['summary']
+        for phase in sorted(summary, key=lambda p: -summary[p]['p50']):
+            print("{:<24} {:>6} {:<14} {:>9.2f} {:>9.2f} {:>9.2f}".format(
+                entry['scenario'],
+                entry['users_num'],
+                phase,
+                summary[phase]['p50'],
+                summary[phase]['p90'],
+                summary[phase]['p95']
+            ))
+
+
+if __name__ == "__main__":
+    args, test_argv = benchmark_args()
+    results = []
+    failures = 0
+    for scenario in args.scenarios.split(','):
+        for users_num in [int(n) for n in args.users_nums.split(',')]:
+            runs = []
+            for i in range(args.repeat):
+                print("Running '{}' with {} users ({}/{}) ...".format(
+                    scenario, users_num, i + 1, args.repeat
+                ))
+                timings = run_once(scenario, users_num, test_argv)
+                if timings is None:
+                    failures += 1
+                else:
+                    runs.append(timings)
+            results.append({
+                'scenario': scenario,
+                'users_num': users_num,
+                'runs': len(runs),
+                'failures': args.repeat - len(runs),
+                'summary': summarize(runs) if runs else {}
+            })
+
+    with open(args.output, 'w') as f:
+        f.write(json.dumps({
+            'test_args': test_argv,
+            'repeat': args.repeat,
+            'results': results
+        }, indent=4, sort_keys=True))
+    print_summary(results)
+    print("\nBenchmark results written to {}".format(args.output))
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,99 @@
+#!/usr/bin/python2
+import os
+import json
+import shutil
+
+# leveldb never modifies its table files after writing them, so they can be
+# shared between a datadir and its snapshots. Everything else (logs,
+# manifests, keys) is copied since it may be appended to or rewritten.
+IMMUTABLE_SUFFIXES = ('.ldb', '.sst')
+# runtime files of a node that must not be part of a snapshot
+SKIPPED_FILES = ('geth.ipc', 'node.log', 'LOCK')
+
+
+def link_or_copy(src, dst):
+    if src.endswith(IMMUTABLE_SUFFIXES):
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            # different filesystem or no hardlink support
+            pass
+    shutil.copy2(src, dst)
+
+
+def snapshot_tree(src, dst):
+    """Cheaply copy the directory tree `src` into `dst`"""
+    for root, dirs, files in os.walk(src):
+        target = os.path.join(dst, os.path.relpath(root, src))
+        if not os.path.isdir(target):
+            os.makedirs(target)
+        for name in files:
+            if name in SKIPPED_FILES:
+                continue
+            link_or_copy(os.path.join(root, name), os.path.join(target, name))
+
+
+def checkpoint_path(checkpoints_dir, name):
+    return os.path.join(checkpoints_dir, name)
+
+
+def save_checkpoint(checkpoints_dir, name, datadir, genesis, state):
+    """
+    Save a named checkpoint of the chain and of the test framework state
+
+    Parameters
+    ----------
+    checkpoints_dir : string
+    The directory under which all checkpoints are kept
+
+    name : string
+    The name of the checkpoint. An existing checkpoint with the same name
+    is replaced.
+
+    datadir : string
+    The data directory of the (stopped) node to snapshot
+
+    genesis : string
+    Path to the genesis block the chain was created with
+
+    state : dict
+    A json serializable dict of the framework state to restore later
+    """
+    path = checkpoint_path(checkpoints_dir, name)
+    # build the checkpoint aside and swap it in, since parallel runs may
+    # save a checkpoint with the same name
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    try:
+        snapshot_tree(datadir, os.path.join(tmp_path, 'datadir'))
+        shutil.copy2(genesis, os.path.join(tmp_path, 'genesis_block.json'))
+        with open(os.path.join(tmp_path, 'state.json'), 'w') as f:
+            f.write(json.dumps(state))
+    except:
+        # do not leave a partial checkpoint next to the real ones
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    shutil.rmtree(path, ignore_errors=True)
+    os.rename(tmp_path, path)
+    print("Saved checkpoint '{}'".format(name))
+
+
+def load_checkpoint(checkpoints_dir, name, datadir, genesis):
+    """
+    Replace `datadir` and `genesis` with the contents of a checkpoint and
+    return the framework state saved along with it
+    """
+    path = checkpoint_path(checkpoints_dir, name)
+    state_file = os.path.join(path, 'state.json')
+    if not os.path.isfile(state_file):
+        print("ERROR: No checkpoint named '{}' found in {}".format(
+            name, checkpoints_dir
+        ))
+        return None
+    shutil.rmtree(datadir, ignore_errors=True)
+    snapshot_tree(os.path.join(path, 'datadir'), datadir)
+    shutil.copy2(os.path.join(path, 'genesis_block.json'), genesis)
+    with open(state_file, 'r') as f:
+        state = json.loads(f.read())
+    print("Forked chain from checkpoint '{}'".format(name))
+    return state
@@ -0,0 +1,155 @@
+#!/usr/bin/python2
+import os
+import re
+import json
+import time
+import hashlib
+import subprocess
+from utils import rm_file
+
+
+IMPORT_RE = re.compile(r'^\s*import\s+"([^"]+)"\s*;', re.MULTILINE)
+
+
+def source_closure(contract_path):
+    """
+    Return a list of (path, contents) tuples for the given solidity file and
+    all the files it transitively imports, in a deterministic order
+    """
+    seen = []
+    result = []
+    stack = [os.path.realpath(contract_path)]
+    while stack:
+        path = stack.pop()
+        if path in seen:
+            continue
+        seen.append(path)
+        with open(path, 'r') as f:
+            contents = f.read()
+        result.append((os.path.basename(path), contents))
+        base = os.path.dirname(path)
+        for imported in reversed(IMPORT_RE.findall(contents)):
+            stack.append(os.path.realpath(os.path.join(base, imported)))
+    return result
+
+
+def sources_revision(contract_path):
+    """
+    Short hash of a solidity file and all the files it imports, which tells
+    measurements made against different revisions of the contracts apart
+    """
+    h = hashlib.sha256()
+    for name, contents in source_closure(contract_path):
+        h.update(name)
+        h.update(contents)
+    return h.hexdigest()[:12]
+
+
+class CompileCache():
+    """
+    On-disk cache of solc compilation artifacts.
+
+    Entries are keyed by a hash of the sources (including all transitive
+    imports), the solc version and any extra flags that affect the output.
+    When the cache grows above `max_bytes` the least recently used entries
+    are evicted.
+    """
+    def __init__(self, cache_dir, solc, max_bytes):
+        self.cache_dir = cache_dir
+        self.solc = solc
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.saved_secs = 0.0
+        self._solc_version = None
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+    def solc_version(self):
+        if self._solc_version is None:
+            self._solc_version = subprocess.check_output(
+                [self.solc, '--version']
+            ).strip()
+        return self._solc_version
+
+    def key(self, contract_path, flags):
+        h = hashlib.sha256()
+        h.update(self.solc_version())
+        h.update(json.dumps(flags, sort_keys=True))
+        for name, contents in source_closure(contract_path):
+            h.update(name)
+            h.update(hashlib.sha256(contents).hexdigest())
+        return h.hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, '{}.json'.format(key))
+
+    def get(self, key):
+        path = self.entry_path(key)
+        try:
+            with open(path, 'r') as f:
+                entry = json.loads(f.read())
+        except (IOError, ValueError):
+            return None
+        # touch the entry so that eviction is least recently used first
+        os.utime(path, None)
+        return entry
+
+    def put(self, key, output, compile_secs):
+        path = self.entry_path(key)
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'w') as f:
+            f.write(json.dumps({
+                'output': output,
+                'compile_secs': compile_secs
+            }))
+        # atomic so that concurrent runs never see a partial entry
+        os.rename(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        entries.sort()
+        while total > self.max_bytes and entries:
+            _, size, path = entries.pop(0)
+            rm_file(path)
+            total -= size
+
+    def compile(self, contract_path, flags, compile_fn):
+        """
+        Return the compiled output for `contract_path`, either from the
+        cache or by calling `compile_fn(contract_path)` and storing its result
+        """
+        key = self.key(contract_path, flags)
+        entry = self.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.saved_secs += entry['compile_secs']
+            print("    Using cached artifacts for {}".format(
+                os.path.basename(contract_path)
+            ))
+            return entry['output']
+
+        self.misses += 1
+        start = time.time()
+        output = compile_fn(contract_path)
+        self.put(key, output, time.time() - start)
+        return output
+
+    def report(self):
+        print(
+            "Compile cache: {} hits, {} misses, {:.2f} seconds saved".format(
+                self.hits, self.misses, self.saved_secs
+            )
+        )
@@ -0,0 +1,140 @@
+#!/usr/bin/python2
+import json
+import pipes
+import random
+from runner import ScenarioRun, strip_args, warm_compile_cache, run_pool
+from runner import RUNNER_VALUE_ARGS, RUNNER_FLAG_ARGS
+from scheduler import dependency_chain
+
+# arguments of the fuzzer itself, which the fuzzed runs must not inherit
+FUZZ_VALUE_ARGS = ['--fuzz', '--fuzz-failures', '--seed']
+
+# ranges the fuzzed parameters are drawn from
+FUZZ_USERS_NUMS = [3, 4, 5, 8, 13, 21]
+FUZZ_MIN_VALUE = (20, 200)
+FUZZ_PROPOSAL_DEPOSIT = (21, 60)
+FUZZ_TOTAL_REWARDS = (1, 500)
+FUZZ_SPLIT_GAS = (3500000, 4500000)
+
+# the scenarios that consume each fuzzed parameter
+FUZZ_PARAM_SCENARIOS = {
+    'users_num': ['deploy'],
+    'min_value': ['deploy', 'fund'],
+    'proposal_deposit': [
+        'proposal', 'rewards', 'proposals-load', 'transfers-load'
+    ],
+    'total_rewards': ['rewards'],
+    'split_gas': ['split', 'split-load'],
+}
+
+
+def fuzz_config(seed, scenario, fork=None):
+    """
+    Return the parameters of `scenario` derived from `seed`, as a dict of
+    argument names to values. The token distribution and the votes are not
+    part of it since test.py draws them from its random generator, which
+    is seeded with the same seed. When the chain is forked from the
+    checkpoint of `fork`, the parameters that only the scenarios up to it
+    consume already shaped the chain and are left out.
+    """
+    rng = random.Random(seed)
+    config = {
+        'users_num': rng.choice(FUZZ_USERS_NUMS),
+        'min_value': rng.randint(*FUZZ_MIN_VALUE),
+        'proposal_deposit': rng.randint(*FUZZ_PROPOSAL_DEPOSIT),
+        'total_rewards': rng.randint(*FUZZ_TOTAL_REWARDS),
+        'split_gas': rng.randint(*FUZZ_SPLIT_GAS)
+    }
+    if fork:
+        played = set(dependency_chain(scenario)) - set(dependency_chain(fork))
+        for name, scenarios in FUZZ_PARAM_SCENARIOS.iteritems():
+            if not played.intersection(scenarios):
+                del config[name]
+    return config
+
+
+def config_argv(config):
+    """The test.py arguments that set the parameters of a configuration"""
+    result = []
+    for name in sorted(config):
+        result += ['--' + name.replace('_', '-'), str(config[name])]
+    return result
+
+
+def apply_config(args, config):
+    for name, value in config.iteritems():
+        setattr(args, name, value)
+
+
+def replay_argv(scenario, seed, args, base_argv):
+    """
+    The test.py arguments that play out the configuration of `seed` again,
+    with all the arguments the fuzzed run was started with. A fork from
+    --from-checkpoint is part of `base_argv`.
+    """
+    argv = base_argv + ['--scenario', scenario, '--fuzz-replay', str(seed)]
+    if not args.from_checkpoint:
+        argv.append('--clean-chain')
+    return argv
+
+
+def replay_command(argv):
+    return ' '.join(['./test.py'] + [pipes.quote(arg) for arg in argv])
+
+
+def run_fuzz(args, argv):
+    """
+    Play out --fuzz configurations of --scenario, each derived from its own
+    seed, up to --jobs of them at the same time. With --from-checkpoint
+    every run forks the chain from that checkpoint instead of starting from
+    a clean one. The seeds of the failed configurations are written to
+    --fuzz-failures. Returns the exit code of the whole run.
+    """
+    seed = args.seed if args.seed is not None else random.randint(0, 2**31)
+    print("Fuzzing '{}' with {} configurations from seed {}".format(
+        args.scenario, args.fuzz, seed
+    ))
+    rng = random.Random(seed)
+    seeds = [rng.randint(0, 2**31) for _ in range(args.fuzz)]
+    base_argv = strip_args(
+        argv, RUNNER_VALUE_ARGS + FUZZ_VALUE_ARGS, RUNNER_FLAG_ARGS
+    )
+    warm_compile_cache(args, base_argv)
+
+    runs = []
+    for i, run_seed in enumerate(seeds):
+        config = fuzz_config(run_seed, args.scenario, args.from_checkpoint)
+        run = ScenarioRun(
+            args.scenario,
+            i + 1,
+            args,
+            base_argv,
+            ['--seed', str(run_seed)] + config_argv(config),
+            '{}#{}'.format(args.scenario, run_seed)
+        )
+        run.seed = run_seed
+        run.config = config
+        runs.append(run)
+    run_pool(runs, args.jobs)
+
+    failures = []
+    for run in runs:
+        if run.passed():
+            continue
+        argv = replay_argv(args.scenario, run.seed, args, base_argv)
+        failures.append({
+            'scenario': args.scenario,
+            'seed': run.seed,
+            'config': run.config,
+            'work_dir': run.work_dir,
+            'replay_argv': argv,
+            'replay': replay_command(argv)
+        })
+    with open(args.fuzz_failures, 'w') as f:
+        f.write(json.dumps(failures, indent=4, sort_keys=True))
+    for failure in failures:
+        print("Replay with: {}".format(failure['replay']))
+    print("{} of {} configurations failed. Failures written to {}".format(
+        len(failures), len(runs), args.fuzz_failures
+    ))
+    return 1 if failures else 0
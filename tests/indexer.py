@@ -0,0 +1,388 @@
+#!/usr/bin/python2
+"""
+Incremental index of the events of the DAO, TokenSale and token contracts.
+
+The index consumes the logs of a node block by block into a SQLite store,
+keyed by contract, proposal, account and block, and picks up where it left
+off on the next update. Alongside the raw events it replays the token ledger
+from `SoldToken` and `Transfer`, so that every `Voted` event gets the weight
+the vote was counted with. Scenario assertions can then be answered from the
+index, e.g. the yea and nay totals of a proposal or the tokens each holder
+bought, instead of with a contract call per holder.
+
+Wei values do not fit in SQLite's 64 bit integers and are stored as decimal
+strings. Sums over them are done in python.
+"""
+import sys
+import json
+import sqlite3
+import argparse
+from rpc import RPCClient
+
+# the events indexed, in their canonical form. Parameters ending in
+# ` indexed` are topics, the others are abi encoded in the data of the log.
+EVENT_SIGNATURES = {
+    'SoldToken': ['address indexed', 'uint256'],
+    'FundingToDate': ['uint256'],
+    'Refund': ['address indexed', 'uint256'],
+    'ProposalAdded': [
+        'uint256 indexed', 'address', 'uint256', 'bool', 'string'
+    ],
+    'Voted': ['uint256 indexed', 'bool', 'address indexed'],
+    'ProposalTallied': ['uint256 indexed', 'bool', 'uint256'],
+    'NewServiceProvider': ['address indexed'],
+    'Transfer': ['address indexed', 'address indexed', 'uint256'],
+}
+# names of the decoded arguments of each event
+EVENT_ARGS = {
+    'SoldToken': ['to', 'amount'],
+    'FundingToDate': ['value'],
+    'Refund': ['to', 'value'],
+    'ProposalAdded': [
+        'proposalID', 'recipient', 'amount', 'newServiceProvider',
+        'description'
+    ],
+    'Voted': ['proposalID', 'position', 'voter'],
+    'ProposalTallied': ['proposalID', 'result', 'quorum'],
+    'NewServiceProvider': ['newServiceProvider'],
+    'Transfer': ['from', 'to', 'amount'],
+}
+# the argument each event is keyed by as its proposal and account
+EVENT_KEYS = {
+    'SoldToken': (None, 'to'),
+    'FundingToDate': (None, None),
+    'Refund': (None, 'to'),
+    'ProposalAdded': ('proposalID', 'recipient'),
+    'Voted': ('proposalID', 'voter'),
+    'ProposalTallied': ('proposalID', None),
+    'NewServiceProvider': (None, 'newServiceProvider'),
+    'Transfer': (None, 'from'),
+}
+# blocks fetched with a single eth_getLogs call
+BLOCKS_PER_REQUEST = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS events (
+    block INTEGER, log_index INTEGER, tx_hash TEXT, contract TEXT,
+    event TEXT, proposal_id INTEGER, account TEXT, args TEXT,
+    PRIMARY KEY (block, log_index)
+);
+CREATE INDEX IF NOT EXISTS events_proposal
+    ON events (contract, proposal_id, event);
+CREATE INDEX IF NOT EXISTS events_account ON events (contract, account, event);
+CREATE TABLE IF NOT EXISTS balances (
+    contract TEXT, account TEXT, balance TEXT,
+    PRIMARY KEY (contract, account)
+);
+CREATE TABLE IF NOT EXISTS votes (
+    contract TEXT, proposal_id INTEGER, voter TEXT, position INTEGER,
+    weight TEXT, block INTEGER,
+    PRIMARY KEY (contract, proposal_id, voter)
+);
+"""
+
+
+def signature(name):
+    return '{}({})'.format(name, ','.join(
+        param.split(' ')[0] for param in EVENT_SIGNATURES[name]
+    ))
+
+
+def decode_word(kind, word):
+    """Decode a 32 byte abi word, given as 64 hex characters"""
+    if kind == 'address':
+        return '0x' + word[24:]
+    if kind == 'bool':
+        return int(word, 16) != 0
+    return int(word, 16)
+
+
+def decode_log(name, log):
+    """Return the arguments of an event log as a dict"""
+    topics = log['topics'][1:]
+    data = log['data'][2:]
+    words = [data[i:i + 64] for i in range(0, len(data), 64)]
+    values = []
+    for param in EVENT_SIGNATURES[name]:
+        kind = param.split(' ')[0]
+        if param.endswith(' indexed'):
+            values.append(decode_word(kind, topics.pop(0)[2:]))
+        elif kind == 'string':
+            offset = int(words.pop(0), 16) * 2
+            length = int(data[offset:offset + 64], 16)
+            start = offset + 64
+            values.append(data[start:start + length * 2].decode('hex'))
+        else:
+            values.append(decode_word(kind, words.pop(0)))
+    return dict(zip(EVENT_ARGS[name], values))
+
+
+class EventIndex():
+    """
+    SQLite index of the events of a node. `path` can be ':memory:' for an
+    index that lives as long as the run. An index of blocks the node no
+    longer has, such as one from before --clean-chain or from before a
+    checkpoint was restored, is dropped on the next update.
+    """
+    def __init__(self, path, rpc):
+        self.rpc = rpc
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        self.topics = None
+
+    def state(self, key):
+        row = self.db.execute(
+            'SELECT value FROM state WHERE key = ?', (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, key, value):
+        self.db.execute(
+            'INSERT OR REPLACE INTO state VALUES (?, ?)', (key, value)
+        )
+
+    def event_topics(self):
+        """The topic of every event, hashed by the node"""
+        if self.topics is None:
+            names = sorted(EVENT_SIGNATURES)
+            hashes = self.rpc.batch([
+                ('web3_sha3', ['0x' + signature(name).encode('hex')])
+                for name in names
+            ])
+            self.topics = dict(zip(hashes, names))
+        return self.topics
+
+    def block_hash(self, number):
+        block = self.rpc.call('eth_getBlockByNumber', hex(number), False)
+        return block['hash'] if block else None
+
+    def reset_if_stale(self):
+        genesis = self.block_hash(0)
+        last = self.state('last_block')
+        stale = self.state('genesis') != genesis or (
+            last is not None
+            and self.block_hash(int(last)) != self.state('last_hash')
+        )
+        if stale:
+            for table in ('state', 'events', 'balances', 'votes'):
+                self.db.execute('DELETE FROM {}'.format(table))
+            self.set_state('genesis', genesis)
+
+    def update(self):
+        """
+        Index the logs of all blocks mined since the last update. Returns
+        the number of events indexed.
+        """
+        self.reset_if_stale()
+        topics = self.event_topics()
+        last = self.state('last_block')
+        first = int(last) + 1 if last is not None else 0
+        head = int(self.rpc.call('eth_blockNumber'), 16)
+        count = 0
+        for start in range(first, head + 1, BLOCKS_PER_REQUEST):
+            end = min(start + BLOCKS_PER_REQUEST - 1, head)
+            logs = self.rpc.call('eth_getLogs', {
+                'fromBlock': hex(start),
+                'toBlock': hex(end),
+                'topics': [topics.keys()]
+            })
+            logs.sort(key=lambda l: (
+                int(l['blockNumber'], 16), int(l['logIndex'], 16)
+            ))
+            for log in logs:
+                name = topics.get(log['topics'][0])
+                if name:
+                    self.add(name, log)
+                    count += 1
+            self.set_state('last_block', str(end))
+        if head >= first:
+            self.set_state('last_hash', self.block_hash(head))
+        self.db.commit()
+        return count
+
+    def add(self, name, log):
+        args = decode_log(name, log)
+        contract = log['address'].lower()
+        block = int(log['blockNumber'], 16)
+        proposal_key, account_key = EVENT_KEYS[name]
+        self.db.execute(
+            'INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (
+                block,
+                int(log['logIndex'], 16),
+                log['transactionHash'],
+                contract,
+                name,
+                args[proposal_key] if proposal_key else None,
+                args[account_key] if account_key else None,
+                json.dumps(dict(
+                    (k, v if isinstance(v, (bool, str)) else str(v))
+                    for k, v in args.iteritems()
+                ))
+            )
+        )
+        # replay the token ledger, in which a split burns tokens with a
+        # transfer to the zero address and a refund of the sale zeroes the
+        # balance of the holder without a transfer
+        if name == 'SoldToken':
+            self.add_balance(contract, args['to'], args['amount'])
+        elif name == 'Refund':
+            self.set_balance(contract, args['to'], 0)
+        elif name == 'Transfer':
+            self.add_balance(contract, args['from'], -args['amount'])
+            self.add_balance(contract, args['to'], args['amount'])
+        elif name == 'Voted':
+            self.db.execute(
+                'INSERT OR REPLACE INTO votes VALUES (?, ?, ?, ?, ?, ?)',
+                (
+                    contract,
+                    args['proposalID'],
+                    args['voter'],
+                    args['position'],
+                    str(self.balance(contract, args['voter'])),
+                    block
+                )
+            )
+
+    def balance(self, contract, account):
+        row = self.db.execute(
+            'SELECT balance FROM balances WHERE contract = ? AND account = ?',
+            (contract.lower(), account)
+        ).fetchone()
+        return int(row[0]) if row else 0
+
+    def set_balance(self, contract, account, balance):
+        self.db.execute(
+            'INSERT OR REPLACE INTO balances VALUES (?, ?, ?)',
+            (contract, account, str(balance))
+        )
+
+    def add_balance(self, contract, account, amount):
+        self.set_balance(
+            contract, account, self.balance(contract, account) + amount
+        )
+
+    def events(self, contract, name, proposal_id=None, account=None):
+        """The arguments of the events of a contract, in order"""
+        query = 'SELECT args FROM events WHERE contract = ? AND event = ?'
+        params = [contract.lower(), name]
+        if proposal_id is not None:
+            query += ' AND proposal_id = ?'
+            params.append(proposal_id)
+        if account is not None:
+            query += ' AND account = ?'
+            params.append(account.lower())
+        query += ' ORDER BY block, log_index'
+        return [json.loads(row[0]) for row in self.db.execute(query, params)]
+
+    def proposal_ids(self, contract):
+        """Dict of the description of every proposal of a contract to its id"""
+        return dict(
+            (args['description'], int(args['proposalID']))
+            for args in self.events(contract, 'ProposalAdded')
+        )
+
+    def tally(self, contract, proposal_id):
+        """Return the (yea, nay) totals of the votes on a proposal in wei"""
+        yea, nay = 0, 0
+        for position, weight in self.db.execute(
+                'SELECT position, weight FROM votes '
+                'WHERE contract = ? AND proposal_id = ?',
+                (contract.lower(), proposal_id)):
+            if position:
+                yea += int(weight)
+            else:
+                nay += int(weight)
+        return yea, nay
+
+    def purchases(self, contract, accounts):
+        """Tokens in wei bought in the sale by each of `accounts`"""
+        totals = dict((account.lower(), 0) for account in accounts)
+        for args in self.events(contract, 'SoldToken'):
+            if args['to'] in totals:
+                totals[args['to']] += int(args['amount'])
+        return [totals[account.lower()] for account in accounts]
+
+    def balances(self, contract, accounts):
+        """Token balances in wei of `accounts` replayed from the events"""
+        return [self.balance(contract, a.lower()) for a in accounts]
+
+
+def encode_log(name, args, block, log_index, contract):
+    """A log of an event without string arguments, as a node returns it"""
+    words = []
+    for param, arg in zip(EVENT_SIGNATURES[name], EVENT_ARGS[name]):
+        value = args[arg]
+        if isinstance(value, str):
+            value = int(value, 16)
+        words.append((param.endswith(' indexed'), '{:064x}'.format(value)))
+    return {
+        'address': contract,
+        'blockNumber': hex(block),
+        'logIndex': hex(log_index),
+        'transactionHash': '0x{:064x}'.format(block),
+        'topics': ['0x' + name.encode('hex')] + [
+            '0x' + word for indexed, word in words if indexed
+        ],
+        'data': '0x' + ''.join(word for indexed, word in words if not indexed)
+    }
+
+
+def self_check():
+    """
+    Replay a sale in which one holder is refunded before both vote, and
+    check the balances and vote weights the index derives from it
+    """
+    dao = '0x' + 'da' * 20
+    alice, bob = '0x' + '0a' * 20, '0x' + '0b' * 20
+    index = EventIndex(':memory:', None)
+    logs = [
+        ('SoldToken', {'to': alice, 'amount': 30}),
+        ('SoldToken', {'to': bob, 'amount': 50}),
+        ('Transfer', {'from': bob, 'to': alice, 'amount': 10}),
+        ('Refund', {'to': bob, 'value': 50}),
+        ('Voted', {'proposalID': 1, 'position': True, 'voter': alice}),
+        ('Voted', {'proposalID': 1, 'position': False, 'voter': bob}),
+    ]
+    for block, (name, args) in enumerate(logs):
+        index.add(name, encode_log(name, args, block, 0, dao))
+    checks = [
+        ('balances', index.balances(dao, [alice, bob]), [40, 0]),
+        ('tally', index.tally(dao, 1), (40, 0)),
+        ('purchases', index.purchases(dao, [alice, bob]), [30, 50]),
+    ]
+    for check, value, expected in checks:
+        if value != expected:
+            print("ERROR: The index has {} {} while {} was expected".format(
+                check, value, expected
+            ))
+            sys.exit(1)
+    print("Event index self-check passed")
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(
+        description='Index the DAO events of a running node'
+    )
+    p.add_argument('--rpc-port', type=int, default=8545)
+    p.add_argument(
+        '--db', help='SQLite file of the index', default='events.db'
+    )
+    p.add_argument(
+        '--self-check',
+        action='store_true',
+        help='Replay a known sequence of events instead of indexing a node'
+    )
+    args = p.parse_args()
+    if args.self_check:
+        self_check()
+        sys.exit(0)
+    index = EventIndex(
+        args.db, RPCClient('http://127.0.0.1:{}'.format(args.rpc_port))
+    )
+    print("Indexed {} new events".format(index.update()))
+    for contract, name, count in index.db.execute(
+            'SELECT contract, event, COUNT(*) FROM events '
+            'GROUP BY contract, event ORDER BY contract, event'):
+        print("{} {:<20} {:>8}".format(contract, name, count))
@@ -1,22 +1,271 @@
 #!/usr/bin/python2
+import json
 
+# gas given to each kind of transaction the scripts send, by label
+DEFAULT_TX_GAS = {
+    'DAO_Creator': 3000000,
+    'DAO': 4000000,
+    'SampleOffer': 3000000,
+    'fallback': 200000,
+    'addAllowedAddress': 1000000,
+    'newProposal': 1000000,
+    'vote': 1000000,
+    'executeProposal': 1000000,
+    'payDAO': 100000,
+    'getMyReward': 1000000,
+    'transfer': 200000,
+    'transferFrom': 200000,
+    'transferWithoutReward': 1000000,
+    'transferFromWithoutReward': 1000000,
+    'approve': 100000,
+    'donation': 100000,
+}
+
+
+def js_artifacts(contracts):
+    """
+    Javascript defining the abi, bytecode and contract object of each
+    compiled contract, written once per build and loaded by all scripts
+
+    Parameters
+    ----------
+    contracts : list
+    A list of (name, abi, bytecode) tuples. For a name such as `dao` the
+    variables `daoAbi`, `daoBin` and `daoContract` are defined.
+    """
+    s = ""
+    for name, abi, bytecode in contracts:
+        s += "var {0}Abi = {1};\nvar {0}Bin = '{2}';\n".format(
+            name, abi, bytecode
+        )
+        s += "var {0}Contract = web3.eth.contract({0}Abi);\n".format(name)
+    return s
 
-def js_common_intro(accounts_num):
+
+def js_common_intro(confirm_timeout, artifacts=None, tx_gas=None):
     """Common  functions, variables to add to all js scripts"""
-    s = "console.log('unlocking accounts');\n"
-    for i in range(0, accounts_num):
-        s += "personal.unlockAccount(eth.accounts[{}], '123');\n".format(i)
+    s = ""
+    if artifacts:
+        s += 'loadScript("{}");\n'.format(artifacts)
+    # accounts are unlocked once by the node when it starts
     s += """// set coinbase to something other than service provider and proposal creator
 web3.miner.setEtherbase(eth.accounts[2]);
 
 var serviceProvider = eth.accounts[0];
 var proposalCreator = eth.accounts[1];
 var testMap = {};
+// the on-chain phase the script last entered
+var currentPhase = 'setup';
+var confirmTimeout = """ + str(confirm_timeout) + """;
+var txGas = """ + json.dumps(tx_gas or DEFAULT_TX_GAS) + """;
+
+// hashes of the transactions submitted since the last checkWork()
+var trackedTxs = [];
+
+function track(txHash, label) {
+    trackedTxs.push({hash: txHash, label: label, submitted: Date.now()});
+    return txHash;
+}
+
+function txStatus(tx, receipt) {
+    if (typeof receipt.status != 'undefined') {
+        return parseInt(receipt.status) == 1 ? 'ok' : 'failed';
+    }
+    // before receipts had a status field a throw consumed all the gas
+    return receipt.gasUsed == eth.getTransaction(tx.hash).gas ? 'failed' : 'ok';
+}
+
+// Execute web3 requests (e.g. `eth.getBalance.request(addr)`) in a single
+// batch and return their results in order. A failed request yields an Error.
+function batchRequests(requests) {
+    var results = new Array(requests.length);
+    var batch = web3.createBatch();
+    requests.forEach(function (request, i) {
+        request.callback = function (err, res) {
+            results[i] = err ? new Error(err) : res;
+        };
+        batch.add(request);
+    });
+    batch.execute();
+    return results;
+}
+
+// A request reading `contract.name(args...)` for batchCalls(). Functions
+// that are not constant, such as isBlocked(), are read through eth_call as
+// well, so nothing is sent.
+function callRequest(contract, name, args) {
+    var request = contract[name].request.apply(null, args);
+    request.method = 'eth_call';
+    request.params.push('latest');
+    request.label = name + '(' + args.join(', ') + ')';
+    return request;
+}
+
+// Execute requests like batchRequests() and return their results in order,
+// aborting the script if any of them failed
+function batchCalls(requests) {
+    var results = batchRequests(requests);
+    results.forEach(function (result, i) {
+        if (result instanceof Error) {
+            console.log("ERROR: Reading " + (requests[i].label || requests[i].method) + " failed: " + result.message);
+            throw result;
+        }
+    });
+    return results;
+}
 
+// Read a contract function taking an address, such as balanceOf, for every
+// one of `addresses` in a single batch request
+function readAccounts(contract, name, addresses) {
+    return batchCalls(addresses.map(function (address) {
+        return callRequest(contract, name, [address]);
+    }));
+}
+
+// wei values as the decimal strings the results report them as
+function decimalStrings(values) {
+    return values.map(function (value) {
+        return value.toString(10);
+    });
+}
+
+// Submit many transactions at once and track them for checkWork(). Nonces
+// are precomputed per sender, so all of them go out in one batch request
+// instead of one blocking round trip per transaction. A rejected
+// transaction aborts the script.
+function sendBatch(txs, label) {
+    if (txs.length == 0) {
+        return [];
+    }
+    var start = Date.now();
+    var senders = [];
+    txs.forEach(function (tx) {
+        if (senders.indexOf(tx.from) == -1) {
+            senders.push(tx.from);
+        }
+    });
+    var counts = batchRequests(senders.map(function (sender) {
+        return eth.getTransactionCount.request(sender, 'pending');
+    }));
+    var nonces = {};
+    senders.forEach(function (sender, i) {
+        if (counts[i] instanceof Error || counts[i] == null) {
+            console.log("ERROR: Looking up the nonce of " + sender + " for " + label + " transactions failed: " + (counts[i] ? counts[i].message : "no result"));
+            throw new Error("failed nonce lookup");
+        }
+        nonces[sender] = counts[i];
+    });
+    var hashes = batchRequests(txs.map(function (tx) {
+        tx.nonce = nonces[tx.from]++;
+        return eth.sendTransaction.request(tx);
+    }));
+    // a rejected transaction leaves a gap in the precomputed nonces of its
+    // sender, behind which none of its later transactions would be mined
+    var rejected = 0;
+    hashes.forEach(function (hash, i) {
+        if (hash instanceof Error) {
+            console.log("ERROR: " + label + " transaction from " + txs[i].from + " with nonce " + txs[i].nonce + " was rejected: " + hash.message);
+            rejected++;
+        }
+    });
+    if (rejected > 0) {
+        throw new Error(rejected + " rejected " + label + " transactions");
+    }
+    hashes.forEach(function (hash) {
+        track(hash, label);
+    });
+    var secs = (Date.now() - start) / 1000;
+    var sent = hashes.length;
+    console.log("Submitted " + sent + " " + label + " transactions in " + secs + " seconds (" + (secs ? (sent / secs).toFixed(1) : sent) + " tx/s)");
+    reportTiming('submit', start);
+    return hashes;
+}
+
+// tell the harness watchdog how long the phase starting now may take
+function startPhase(phase, secs) {
+    currentPhase = phase;
+    console.log("Phase: " + JSON.stringify({phase: phase, timeout: secs}));
+}
+
+// report how long an on-chain phase took to the harness
+function reportTiming(phase, start, blocks) {
+    console.log("Timing: " + JSON.stringify({phase: phase, secs: (Date.now() - start) / 1000, blocks: blocks}));
+}
+
+// report how many calls of a kind were submitted and confirmed per second,
+// from the submission of the first until the confirmation of the last
+function reportThroughput(label, start, calls) {
+    console.log("Throughput: " + JSON.stringify({label: label, calls: calls, secs: (Date.now() - start) / 1000}));
+}
+
+// Mine until every tracked transaction has a receipt. Each receipt is
+// reported as a line of json along with the seconds from submission until it
+// was seen and the number of blocks mined until it was included. A
+// transaction that is dropped or not mined within the timeout aborts the
+// script.
 function checkWork() {
+    var start = Date.now();
+    var startBlock = eth.blockNumber;
+    var pending = trackedTxs;
+    var confirmed = pending.length;
+    var deadline = Date.now() + confirmTimeout * 1000;
+    trackedTxs = [];
+    if (pending.length == 0) {
+        return;
+    }
+    startPhase('confirm', confirmTimeout);
+    miner.start(1);
+    while (true) {
+        pending = pending.filter(function (tx) {
+            var receipt = eth.getTransactionReceipt(tx.hash);
+            if (receipt == null) {
+                if (eth.getTransaction(tx.hash) == null) {
+                    miner.stop(0);
+                    console.log("ERROR: " + tx.label + " transaction " + tx.hash + " was dropped");
+                    throw new Error("dropped transaction");
+                }
+                return true;
+            }
+            console.log("Receipt: " + JSON.stringify({
+                label: tx.label,
+                hash: tx.hash,
+                block: receipt.blockNumber,
+                gasUsed: receipt.gasUsed,
+                status: txStatus(tx, receipt),
+                latency: (Date.now() - tx.submitted) / 1000,
+                blocks: receipt.blockNumber - startBlock
+            }));
+            return false;
+        });
+        if (pending.length == 0) {
+            break;
+        }
+        if (Date.now() > deadline) {
+            miner.stop(0);
+            pending.forEach(function (tx) {
+                console.log("ERROR: " + tx.label + " transaction " + tx.hash + " not mined in " + confirmTimeout + " seconds");
+            });
+            throw new Error("unconfirmed transactions");
+        }
+        admin.sleepBlocks(1);
+    }
+    miner.stop(0);
+    var secs = (Date.now() - start) / 1000;
+    var blocks = eth.blockNumber - startBlock;
+    console.log("Confirmed " + confirmed + " transactions in " + secs + " seconds and " + blocks + " blocks (" + (secs ? (confirmed / secs).toFixed(1) : confirmed) + " tx/s)");
+    reportTiming('confirm', start, blocks);
+}
+
+// Scripts are evaluated through `geth attach`, which exits without running
+// pending timers, so all waiting is done synchronously while mining
+function mineFor(secs) {
+    var start = Date.now();
+    var startBlock = eth.blockNumber;
+    startPhase('wait', secs);
     miner.start(1);
-    admin.sleepBlocks(3);
+    admin.sleep(secs);
     miner.stop(0);
+    reportTiming('wait', start, eth.blockNumber - startBlock);
 }
 
 function bigDiff(astr, bstr) {
@@ -27,13 +276,21 @@ function bigDiffRound(astr, bstr) {
     return Math.round(bigDiff(astr, bstr));
 }
 
+// Results are reported to the harness as one record per line, which it
+// writes to the scenario's results file as they come in
 function addToTest(name, value) {
     testMap[name] = value;
-    console.log("'" + name + "' = " + value);
+    console.log("Result: " + JSON.stringify({
+        key: name,
+        value: value,
+        time: Date.now() / 1000,
+        phase: currentPhase
+    }));
 }
 
+// mark the results of the scenario as complete
 function testResults() {
-    console.log("Test Results: " + JSON.stringify(testMap));
+    console.log("Result: " + JSON.stringify({complete: true, time: Date.now() / 1000}));
 }
 """
     return s
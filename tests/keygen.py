@@ -0,0 +1,103 @@
+#!/usr/bin/python2
+"""
+Deterministic generation of test accounts without going through geth.
+
+Private keys are derived from a seed, so the same seed always gives the same
+accounts, and keystore files are written with test-grade KDF parameters so
+that geth can unlock them instantly.
+"""
+import os
+import sys
+import json
+import uuid
+import hashlib
+
+try:
+    from ethereum import utils as eth_utils
+    from Crypto.Cipher import AES
+    from Crypto.Util import Counter
+except ImportError:
+    eth_utils = None
+
+# A single pbkdf2 round. Only ever use this for throwaway test accounts.
+TEST_KDF_ITERATIONS = 1
+ACCOUNT_PASSWORD = '123'
+
+
+def check_dependencies():
+    if eth_utils is None:
+        print(
+            "Error: Offline account generation needs pyethereum. Install it "
+            "with 'pip install ethereum'"
+        )
+        sys.exit(1)
+
+
+def derive_key(seed, index):
+    """Return the private key of account `index` for the given seed"""
+    return eth_utils.sha3('{}:{}'.format(seed, index))
+
+
+def derive_keys(seed, accounts_num):
+    """Return a list of (private_key, address) tuples"""
+    check_dependencies()
+    result = []
+    for i in range(accounts_num):
+        key = derive_key(seed, i)
+        result.append((key, '0x' + eth_utils.privtoaddr(key).encode('hex')))
+    return result
+
+
+def make_keystore(key, address, password):
+    """Create a version 3 keystore for the key, deterministically"""
+    # salt and iv are derived from the key as well so that the very same
+    # keystore files are produced on every run
+    salt = eth_utils.sha3(key + 'salt')
+    iv = eth_utils.sha3(key + 'iv')[:16]
+    derived = hashlib.pbkdf2_hmac(
+        'sha256', password, salt, TEST_KDF_ITERATIONS, 32
+    )
+    counter = Counter.new(128, initial_value=int(iv.encode('hex'), 16))
+    ciphertext = AES.new(
+        derived[:16], AES.MODE_CTR, counter=counter
+    ).encrypt(key)
+    mac = eth_utils.sha3(derived[16:32] + ciphertext)
+    return {
+        'address': address[2:],
+        'crypto': {
+            'cipher': 'aes-128-ctr',
+            'cipherparams': {'iv': iv.encode('hex')},
+            'ciphertext': ciphertext.encode('hex'),
+            'kdf': 'pbkdf2',
+            'kdfparams': {
+                'c': TEST_KDF_ITERATIONS,
+                'dklen': 32,
+                'prf': 'hmac-sha256',
+                'salt': salt.encode('hex')
+            },
+            'mac': mac.encode('hex')
+        },
+        'id': str(uuid.UUID(bytes=eth_utils.sha3(key)[:16])),
+        'version': 3
+    }
+
+
+def keystore_filename(index, address):
+    # geth orders its accounts by keystore file name, so encode the index in
+    # the timestamp part to keep eth.accounts[i] the i-th derived account
+    return 'UTC--2016-01-01T00-00-00.{:09d}Z--{}'.format(index, address[2:])
+
+
+def generate_accounts(seed, accounts_num, keystore_dir):
+    """
+    Derive `accounts_num` accounts from `seed`, write their keystore files in
+    `keystore_dir` and return the list of their addresses
+    """
+    keys = derive_keys(seed, accounts_num)
+    if not os.path.isdir(keystore_dir):
+        os.makedirs(keystore_dir)
+    for i, (key, address) in enumerate(keys):
+        path = os.path.join(keystore_dir, keystore_filename(i, address))
+        with open(path, 'w') as f:
+            f.write(json.dumps(make_keystore(key, address, ACCOUNT_PASSWORD)))
+    return [address for _, address in keys]
@@ -0,0 +1,286 @@
+#!/usr/bin/python2
+import os
+import sys
+import time
+import json
+import signal
+import threading
+import subprocess
+from Queue import Queue, Empty
+from rpc import RPCClient, RPCError
+
+PHASE_PREFIX = 'Phase: '
+TIMING_PREFIX = 'Timing: '
+
+
+class Watchdog():
+    """
+    Deadline for the next sign of progress of a script. Any output line
+    pushes it `idle_timeout` seconds ahead, while a phase announced by the
+    script with its expected duration (e.g. waiting out a debating period)
+    keeps it from expiring until that phase should have ended.
+    """
+    def __init__(self, idle_timeout):
+        self.idle_timeout = idle_timeout
+        self.phase_deadline = 0
+        self.kick()
+
+    def kick(self):
+        self.deadline = max(
+            time.time() + self.idle_timeout, self.phase_deadline
+        )
+
+    def feed(self, line):
+        if line.startswith(PHASE_PREFIX):
+            phase = json.loads(line[len(PHASE_PREFIX):])
+            self.phase_deadline = (
+                time.time() + phase['timeout'] + self.idle_timeout
+            )
+        elif line.startswith(TIMING_PREFIX):
+            self.phase_deadline = 0
+        self.kick()
+
+    def remaining(self):
+        return self.deadline - time.time()
+
+
+def enqueue_lines(stream, queue):
+    for line in iter(stream.readline, ''):
+        queue.put(line)
+    queue.put(None)
+
+
+class GethNode():
+    """
+    A geth node that is started once and kept running in the background for
+    all scripts of a test run. Scripts are executed by attaching to the node
+    over IPC, so no script pays for node startup and chaindata loading.
+
+    With `init_genesis` the chain is initialized with `geth init` instead of
+    the `--genesis` flag, which newer geth versions (e.g. the ones that can
+    seal blocks with clique) require.
+    """
+    def __init__(
+            self,
+            geth,
+            datadir,
+            genesis,
+            network_id=123,
+            rpc_port=8545,
+            port=30303,
+            target_gas_limit=None,
+            init_genesis=False):
+        self.geth = geth
+        self.datadir = os.path.realpath(datadir)
+        self.genesis = os.path.realpath(genesis)
+        self.network_id = network_id
+        self.rpc_port = rpc_port
+        self.port = port
+        self.target_gas_limit = target_gas_limit
+        self.init_genesis = init_genesis
+        self.ipc_path = os.path.join(self.datadir, 'geth.ipc')
+        self.log_path = os.path.join(self.datadir, 'node.log')
+        self.rpc = RPCClient('http://127.0.0.1:{}'.format(rpc_port))
+        self.proc = None
+
+    def command(self):
+        cmd = [
+            self.geth,
+            "--networkid",
+            str(self.network_id),
+            "--nodiscover",
+            "--maxpeers",
+            "0",
+            "--port",
+            str(self.port),
+            "--datadir",
+            self.datadir,
+            "--ipcpath",
+            self.ipc_path,
+            "--rpc",
+            "--rpcaddr",
+            "127.0.0.1",
+            "--rpcport",
+            str(self.rpc_port),
+            # the scripts attach over IPC. Over HTTP only what rpc.py needs
+            # is exposed, since the accounts stay unlocked while it runs.
+            "--rpcapi",
+            "eth,net,web3",
+            "--verbosity",
+            "3"
+        ]
+        if not self.init_genesis:
+            cmd += ["--genesis", self.genesis]
+        if self.target_gas_limit:
+            # otherwise mined blocks drift back to the default gas limit
+            cmd += ["--targetgaslimit", str(self.target_gas_limit)]
+        return cmd
+
+    def is_running(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def start(self, timeout=60):
+        if self.is_running():
+            return
+        print("Starting geth node with datadir {} ...".format(self.datadir))
+        if not os.path.isdir(self.datadir):
+            os.makedirs(self.datadir)
+        self.log = open(self.log_path, 'w')
+        if self.init_genesis and not self.is_initialized():
+            subprocess.check_call(
+                [self.geth, "--datadir", self.datadir, "init", self.genesis],
+                stdout=self.log,
+                stderr=subprocess.STDOUT
+            )
+        self.proc = subprocess.Popen(
+            self.command(),
+            stdout=self.log,
+            stderr=subprocess.STDOUT
+        )
+        self.wait_ready(timeout)
+
+    def is_initialized(self):
+        return os.path.isdir(os.path.join(self.datadir, 'geth', 'chaindata'))
+
+    def wait_ready(self, timeout):
+        """Block until the node answers over both RPC and IPC"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if not self.is_running():
+                self.fail("geth node exited during startup")
+            if os.path.exists(self.ipc_path):
+                try:
+                    version = self.rpc.call('web3_clientVersion')
+                    self.rpc.call('eth_blockNumber')
+                    print("Node is up: {}".format(version))
+                    return
+                except RPCError:
+                    pass
+            time.sleep(0.2)
+        self.stop()
+        self.fail("geth node did not become ready in {} seconds".format(
+            timeout
+        ))
+
+    def health_check(self):
+        if not self.is_running():
+            return False
+        try:
+            self.rpc.call('eth_blockNumber')
+        except RPCError:
+            return False
+        return True
+
+    def fail(self, msg):
+        print("ERROR: {}. Node log was:\n{}".format(msg, self.log_tail()))
+        sys.exit(1)
+
+    def log_tail(self, lines=30):
+        try:
+            with open(self.log_path, 'r') as f:
+                return ''.join(f.readlines()[-lines:])
+        except IOError:
+            return ''
+
+    def attach_command(self, script):
+        return [
+            self.geth,
+            "--exec",
+            'loadScript("{}")'.format(os.path.realpath(script)),
+            "attach",
+            "ipc:{}".format(self.ipc_path)
+        ]
+
+    def unlock_accounts(self, accounts_num, password):
+        """
+        Unlock the first `accounts_num` accounts until the node exits, so
+        that the scripts never pay for decrypting the keys themselves
+        """
+        print("Unlocking {} accounts ...".format(accounts_num))
+        subprocess.check_output([
+            self.geth,
+            "--exec",
+            "for (var i = 0; i < {}; i++) {{ personal.unlockAccount("
+            "eth.accounts[i], '{}', 0); }}".format(accounts_num, password),
+            "attach",
+            "ipc:{}".format(self.ipc_path)
+        ])
+
+    def run_script(self, script, on_line=None, idle_timeout=300, keep=None):
+        """
+        Execute a javascript file against the running node and return its
+        output. The output is passed line by line to `on_line` as it comes
+        in, and the script and its mining are stopped early if that returns
+        False. Only the lines for which `keep` is true are part of the
+        returned output. A script that makes no progress within its watchdog
+        deadline kills the node.
+        """
+        if not self.health_check():
+            self.fail("geth node is not responding")
+        proc = subprocess.Popen(
+            self.attach_command(script),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT
+        )
+        queue = Queue()
+        reader = threading.Thread(
+            target=enqueue_lines, args=(proc.stdout, queue)
+        )
+        reader.daemon = True
+        reader.start()
+        watchdog = Watchdog(idle_timeout)
+        lines = []
+        while True:
+            try:
+                line = queue.get(timeout=max(watchdog.remaining(), 0))
+            except Empty:
+                proc.kill()
+                self.kill()
+                print("ERROR: Script {} made no progress before its watchdog "
+                      "deadline. Output so far:\n{}".format(
+                          script, ''.join(lines)
+                      ))
+                self.fail("killed the geth node")
+            if line is None:
+                break
+            if keep is None or keep(line):
+                lines.append(line)
+            watchdog.feed(line)
+            if on_line and on_line(line.rstrip('\n')) is False:
+                proc.kill()
+                # the script may have been stopped while it was mining
+                proc.wait()
+                self.stop_miner()
+                break
+        proc.wait()
+        return ''.join(lines)
+
+    def stop_miner(self):
+        """Stop mining, which only the IPC console can do"""
+        subprocess.check_output([
+            self.geth,
+            "--exec",
+            "miner.stop(0)",
+            "attach",
+            "ipc:{}".format(self.ipc_path)
+        ])
+
+    def kill(self):
+        if self.is_running():
+            self.proc.kill()
+            self.proc.wait()
+
+    def stop(self, timeout=20):
+        """Gracefully stop the node, killing it if it does not exit in time"""
+        if not self.is_running():
+            return
+        print("Stopping geth node ...")
+        self.proc.send_signal(signal.SIGINT)
+        deadline = time.time() + timeout
+        while self.proc.poll() is None and time.time() < deadline:
+            time.sleep(0.2)
+        if self.proc.poll() is None:
+            self.proc.kill()
+            self.proc.wait()
+        self.proc = None
+        self.log.close()
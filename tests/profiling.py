@@ -0,0 +1,278 @@
+#!/usr/bin/python2
+import os
+import csv
+import json
+from jsutils import DEFAULT_TX_GAS
+from timing import percentile
+
+RECEIPT_PREFIX = 'Receipt: '
+THROUGHPUT_PREFIX = 'Throughput: '
+CSV_FIELDS = ['function', 'users_num', 'calls', 'min', 'mean', 'max']
+# transactions that the scenarios send in batches of up to one per user
+PER_USER_FUNCTIONS = [
+    'fallback', 'vote', 'getMyReward', 'approve', 'transfer', 'transferFrom',
+    'transferWithoutReward', 'transferFromWithoutReward'
+]
+
+
+def parse_receipts(output):
+    """Return the receipts reported by checkWork() in a scenario's output"""
+    receipts = []
+    for line in output.splitlines():
+        if line.startswith(RECEIPT_PREFIX):
+            receipts.append(json.loads(line[len(RECEIPT_PREFIX):]))
+    return receipts
+
+
+def parse_throughputs(output):
+    """Return the throughputs reported by reportThroughput() in an output"""
+    throughputs = []
+    for line in output.splitlines():
+        if line.startswith(THROUGHPUT_PREFIX):
+            throughputs.append(json.loads(line[len(THROUGHPUT_PREFIX):]))
+    return throughputs
+
+
+def size_for_throughput(report, users_num, headroom):
+    """
+    Size the gas of each kind of transaction from the maximum measured in a
+    gas profile report plus `headroom` percent, and the block gas limit so
+    that the transactions sent for all users at once fit in a single block.
+    Returns a (tx_gas, gas_limit) tuple.
+    """
+    tx_gas = dict(DEFAULT_TX_GAS)
+    for function, entries in report.iteritems():
+        if function in tx_gas and entries:
+            measured = max(entry['max'] for entry in entries.values())
+            tx_gas[function] = int(measured * (1 + headroom / 100.0))
+    gas_limit = max(
+        max(tx_gas.values()),
+        max(tx_gas[f] for f in PER_USER_FUNCTIONS) * users_num
+    )
+    return tx_gas, gas_limit
+
+
+class GasProfile():
+    """
+    Gas used by each contract function, aggregated per number of users.
+
+    The report is a dict of the form
+    {function: {users_num: {calls, min, mean, max, total}}}. Loading an
+    existing json report and recording into it keeps the entries of other
+    user counts, so running the same scenarios with several --users-num
+    values builds up a single report.
+    """
+    def __init__(self, users_num):
+        self.users_num = str(users_num)
+        self.report = {}
+        self.recorded = set()
+
+    def load(self, path):
+        if os.path.isfile(path) and not path.endswith('.csv'):
+            with open(path, 'r') as f:
+                self.report = json.loads(f.read())
+
+    def record(self, output):
+        for receipt in parse_receipts(output):
+            # failed calls say nothing about what a function costs
+            if receipt['status'] == 'ok':
+                self.add(receipt['label'], int(receipt['gasUsed']))
+
+    def add(self, function, gas_used):
+        entries = self.report.setdefault(function, {})
+        if (function, self.users_num) not in self.recorded:
+            # results of earlier runs with the same user count are replaced
+            self.recorded.add((function, self.users_num))
+            entries.pop(self.users_num, None)
+        entry = entries.setdefault(self.users_num, {
+            'calls': 0, 'min': gas_used, 'max': gas_used, 'total': 0
+        })
+        entry['calls'] += 1
+        entry['total'] += gas_used
+        entry['min'] = min(entry['min'], gas_used)
+        entry['max'] = max(entry['max'], gas_used)
+        entry['mean'] = entry['total'] / float(entry['calls'])
+
+    def rows(self):
+        for function in sorted(self.report):
+            entries = self.report[function]
+            for users_num in sorted(entries, key=int):
+                row = dict(entries[users_num])
+                row['function'] = function
+                row['users_num'] = int(users_num)
+                yield row
+
+    def write(self, path):
+        """Write the report as csv if `path` ends in .csv, else as json"""
+        with open(path, 'w') as f:
+            if path.endswith('.csv'):
+                writer = csv.DictWriter(
+                    f, CSV_FIELDS, extrasaction='ignore'
+                )
+                writer.writeheader()
+                for row in self.rows():
+                    writer.writerow(row)
+            else:
+                f.write(json.dumps(self.report, indent=4, sort_keys=True))
+        print("Gas profile written to {}".format(path))
+
+    def print_summary(self):
+        print("\n{:<20} {:>6} {:>6} {:>10} {:>12} {:>10}".format(
+            "Function", "Users", "Calls", "Min", "Mean", "Max"
+        ))
+        for row in self.rows():
+            print("{:<20} {:>6} {:>6} {:>10} {:>12.1f} {:>10}".format(
+                row['function'],
+                row['users_num'],
+                row['calls'],
+                row['min'],
+                row['mean'],
+                row['max']
+            ))
+
+    def regressions(self, baseline_path, threshold):
+        """
+        Compare the mean gas of each function and user count with a baseline
+        json report and return a list of descriptions of the ones that grew
+        by more than `threshold` percent
+        """
+        with open(baseline_path, 'r') as f:
+            baseline = json.loads(f.read())
+        result = []
+        for row in self.rows():
+            base = baseline.get(row['function'], {}).get(str(row['users_num']))
+            if base is None or base['mean'] == 0:
+                continue
+            increase = (row['mean'] - base['mean']) * 100.0 / base['mean']
+            if increase > threshold:
+                result.append(
+                    "{} with {} users: mean gas {:.1f} -> {:.1f} "
+                    "(+{:.1f}%)".format(
+                        row['function'],
+                        row['users_num'],
+                        base['mean'],
+                        row['mean'],
+                        increase
+                    )
+                )
+        return result
+
+
+def call_stats(receipts):
+    """
+    Aggregate receipts per kind of call into the number of calls and the
+    gas, seconds until inclusion (latency) and blocks until inclusion of
+    the calls. Failed calls, such as transfers of blocked tokens, are kept
+    apart from the successful ones.
+    """
+    samples = {}
+    for receipt in receipts:
+        call = receipt['label']
+        if receipt['status'] != 'ok':
+            call += ' (failed)'
+        entry = samples.setdefault(
+            call, {'gas': [], 'latency': [], 'blocks': []}
+        )
+        entry['gas'].append(int(receipt['gasUsed']))
+        if receipt.get('latency') is not None:
+            entry['latency'].append(receipt['latency'])
+            entry['blocks'].append(receipt['blocks'])
+    result = {}
+    for call, entry in samples.iteritems():
+        stats = {
+            'calls': len(entry['gas']),
+            'gas_mean': sum(entry['gas']) / float(len(entry['gas'])),
+            'gas_max': max(entry['gas'])
+        }
+        if entry['latency']:
+            stats.update({
+                'latency_p50': percentile(entry['latency'], 50),
+                'latency_p95': percentile(entry['latency'], 95),
+                'latency_max': max(entry['latency']),
+                'blocks_mean': (
+                    sum(entry['blocks']) / float(len(entry['blocks']))
+                ),
+                'blocks_max': max(entry['blocks'])
+            })
+        result[call] = stats
+    return result
+
+
+def add_throughputs(stats, throughputs):
+    """
+    Add the end-to-end calls per second of each kind of call to its stats
+    from `call_stats()`, over all the batches of it that were reported
+    """
+    totals = {}
+    for throughput in throughputs:
+        calls, secs = totals.get(throughput['label'], (0, 0.0))
+        totals[throughput['label']] = (
+            calls + throughput['calls'], secs + throughput['secs']
+        )
+    for call, (calls, secs) in totals.iteritems():
+        if call in stats and secs:
+            stats[call]['per_sec'] = calls / secs
+    return stats
+
+
+class LoadReport():
+    """
+    Latency, blocks until inclusion and gas of every kind of call made by a
+    load scenario at a given scale, such as `proposals=100,users=50`.
+
+    The report is a dict of the form {scenario: {scale: {call: stats}}}.
+    Calls a scenario measures the throughput of also have their end-to-end
+    calls per second in their stats. Like a gas profile an existing json
+    report is updated in place, so running a scenario at several scales
+    builds up a single report.
+    """
+    def __init__(self, scenario, scale):
+        self.scenario = scenario
+        self.scale = scale
+        self.report = {}
+        self.receipts = []
+        self.throughputs = []
+
+    def load(self, path):
+        if os.path.isfile(path):
+            with open(path, 'r') as f:
+                self.report = json.loads(f.read())
+
+    def record(self, output):
+        self.receipts += parse_receipts(output)
+        self.throughputs += parse_throughputs(output)
+
+    def calls(self):
+        return add_throughputs(call_stats(self.receipts), self.throughputs)
+
+    def print_summary(self):
+        print("\n{} at {}".format(self.scenario, self.scale))
+        print("{:<28} {:>7} {:>10} {:>10} {:>9} {:>9} {:>8} {:>8}".format(
+            "Call", "Calls", "Gas mean", "Gas max", "Lat p50", "Lat p95",
+            "Blocks", "Per sec"
+        ))
+        calls = self.calls()
+        for call in sorted(calls):
+            stats = calls[call]
+            print((
+                "{:<28} {:>7} {:>10.1f} {:>10} {:>9} {:>9} {:>8} {:>8}"
+            ).format(
+                call,
+                stats['calls'],
+                stats['gas_mean'],
+                stats['gas_max'],
+                '{:.2f}'.format(stats['latency_p50'])
+                if 'latency_p50' in stats else '',
+                '{:.2f}'.format(stats['latency_p95'])
+                if 'latency_p95' in stats else '',
+                '{:.1f}'.format(stats['blocks_mean'])
+                if 'blocks_mean' in stats else '',
+                '{:.1f}'.format(stats['per_sec'])
+                if 'per_sec' in stats else ''
+            ))
+
+    def write(self, path):
+        self.report.setdefault(self.scenario, {})[self.scale] = self.calls()
+        with open(path, 'w') as f:
+            f.write(json.dumps(self.report, indent=4, sort_keys=True))
+        print("Load report written to {}".format(path))
@@ -0,0 +1,82 @@
+#!/usr/bin/python2
+import json
+import urllib2
+
+
+class RPCError(Exception):
+    pass
+
+
+class RPCClient():
+    """Minimal JSON-RPC client for talking to a local node over HTTP"""
+    def __init__(self, url, timeout=30):
+        self.url = url
+        self.timeout = timeout
+        self.next_id = 1
+
+    def _post(self, payload):
+        req = urllib2.Request(
+            self.url,
+            json.dumps(payload),
+            {'Content-Type': 'application/json'}
+        )
+        try:
+            data = urllib2.urlopen(req, timeout=self.timeout).read()
+        except (urllib2.URLError, IOError) as e:
+            raise RPCError("Could not reach {}: {}".format(self.url, e))
+        return json.loads(data)
+
+    def _request(self, method, params):
+        req = {
+            'jsonrpc': '2.0',
+            'id': self.next_id,
+            'method': method,
+            'params': list(params)
+        }
+        self.next_id += 1
+        return req
+
+    def call(self, method, *params):
+        """Perform a single call and return its result"""
+        response = self._post(self._request(method, params))
+        if 'error' in response:
+            raise RPCError("{} failed: {}".format(
+                method, response['error'].get('message')
+            ))
+        return response['result']
+
+    def batch(self, calls):
+        """
+        Perform many calls in a single JSON-RPC batch request
+
+        Parameters
+        ----------
+        calls : list of tuples
+        A list of (method, params_list) tuples
+
+        Returns
+        ----------
+        results : list
+        The results in the same order as `calls`. Failed calls are returned
+        as RPCError instances instead of raising, so that a single failure
+        does not hide the rest of the batch.
+        """
+        if not calls:
+            return []
+        requests = [self._request(m, p) for m, p in calls]
+        responses = self._post(requests)
+        by_id = dict((r['id'], r) for r in responses)
+        results = []
+        for req in requests:
+            response = by_id.get(req['id'])
+            if response is None:
+                results.append(RPCError("{} got no response".format(
+                    req['method']
+                )))
+            elif 'error' in response:
+                results.append(RPCError("{} failed: {}".format(
+                    req['method'], response['error'].get('message')
+                )))
+            else:
+                results.append(response['result'])
+        return results
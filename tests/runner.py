@@ -0,0 +1,175 @@
+#!/usr/bin/python2
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+
+TEST_PY = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'test.py')
+
+# arguments that the parallel runner sets itself for each scenario process
+RUNNER_VALUE_ARGS = [
+    '--scenario',
+    '--scenarios',
+    '--jobs',
+    '--work-dir',
+    '--data-dir',
+    '--network-id',
+    '--rpc-port',
+    '--port'
+]
+RUNNER_FLAG_ARGS = ['--clean-chain']
+
+
+def strip_args(argv, value_args, flag_args):
+    """Remove the given arguments (and the values they take) from argv"""
+    result = []
+    skip_value = False
+    for arg in argv:
+        if skip_value:
+            skip_value = False
+            continue
+        name = arg.split('=', 1)[0]
+        if name in flag_args:
+            continue
+        if name in value_args:
+            skip_value = '=' not in arg
+            continue
+        result.append(arg)
+    return result
+
+
+class ScenarioRun():
+    """
+    A scenario played out by test.py in its own process and directories.
+    `extra_argv` is appended to the arguments of the run and `label` names it
+    in the reports, for runs of the same scenario with different arguments.
+    `fork` is the name of a checkpoint to fork the chain from.
+    """
+    def __init__(self, scenario, index, args, base_argv, extra_argv=None,
+                 label=None, fork=None):
+        self.scenario = scenario
+        self.label = label or scenario
+        self.work_dir = tempfile.mkdtemp(prefix='dao-{}-'.format(scenario))
+        self.log_path = os.path.join(self.work_dir, 'output.log')
+        self.argv = [sys.executable, TEST_PY] + base_argv + [
+            '--scenario', scenario,
+            '--work-dir', self.work_dir,
+            '--data-dir', os.path.join(self.work_dir, 'data'),
+            '--network-id', str(args.network_id + index),
+            '--rpc-port', str(args.rpc_port + index),
+            '--port', str(args.port + index)
+        ] + (extra_argv or [])
+        if fork:
+            self.argv += ['--from-checkpoint', fork]
+        elif not args.from_checkpoint:
+            self.argv.append('--clean-chain')
+        self.proc = None
+        self.duration = None
+        # set when the run is never started because the run it forks from
+        # failed
+        self.skipped = False
+
+    def start(self):
+        self.log = open(self.log_path, 'w')
+        self.start_time = time.time()
+        self.proc = subprocess.Popen(
+            self.argv,
+            stdout=self.log,
+            stderr=subprocess.STDOUT,
+            cwd=self.work_dir
+        )
+
+    def finished(self):
+        if self.proc.poll() is None:
+            return False
+        if self.duration is None:
+            self.duration = time.time() - self.start_time
+            self.log.close()
+        return True
+
+    def passed(self):
+        return self.proc is not None and self.proc.returncode == 0
+
+    def result(self):
+        if self.skipped:
+            return "SKIPPED"
+        return "PASSED" if self.passed() else "FAILED"
+
+    def output(self):
+        with open(self.log_path, 'r') as f:
+            return f.read()
+
+
+def warm_compile_cache(args, base_argv):
+    """
+    Compile the contracts once before fanning out, so that all scenario
+    processes find the artifacts in the compile cache
+    """
+    if args.no_compile_cache:
+        return
+    print("Compiling the DAO contracts once for all scenarios ...")
+    work_dir = tempfile.mkdtemp(prefix='dao-compile-')
+    argv = strip_args(base_argv, ['--from-checkpoint'], ['--checkpoint'])
+    subprocess.call([sys.executable, TEST_PY] + argv + [
+        '--scenario', 'none',
+        '--work-dir', work_dir,
+        '--data-dir', os.path.join(work_dir, 'data')
+    ], cwd=work_dir)
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def report(runs, total_secs):
+    print("\n{:<28} {:<8} {:>10}".format("Scenario", "Result", "Seconds"))
+    for run in runs:
+        print("{:<28} {:<8} {:>10.1f}".format(
+            run.label,
+            run.result(),
+            run.duration or 0.0
+        ))
+    passed = len([r for r in runs if r.passed()])
+    print("{}/{} scenarios passed in {:.1f} seconds (sum of scenario times "
+          "{:.1f} seconds)".format(
+              passed,
+              len(runs),
+              total_secs,
+              sum(r.duration or 0.0 for r in runs)
+          ))
+    for run in runs:
+        if run.proc is not None and not run.passed():
+            print("\nOutput of failed scenario '{}' (kept in {}):\n{}".format(
+                run.label, run.work_dir, run.output()
+            ))
+
+
+def run_pool(runs, jobs):
+    """
+    Play out the runs, up to `jobs` of them at the same time, report their
+    results and remove the work directories of the ones that passed
+    """
+    pending = list(runs)
+    running = []
+    start = time.time()
+    while pending or running:
+        while pending and len(running) < jobs:
+            run = pending.pop(0)
+            print("Starting scenario '{}' in {}".format(
+                run.label, run.work_dir
+            ))
+            run.start()
+            running.append(run)
+        for run in list(running):
+            if run.finished():
+                running.remove(run)
+                print("Scenario '{}' {} after {:.1f} seconds".format(
+                    run.label,
+                    "PASSED" if run.passed() else "FAILED",
+                    run.duration
+                ))
+        time.sleep(0.2)
+
+    report(runs, time.time() - start)
+    for run in runs:
+        if run.passed():
+            shutil.rmtree(run.work_dir, ignore_errors=True)
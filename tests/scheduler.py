@@ -0,0 +1,171 @@
+#!/usr/bin/python2
+import os
+import time
+import shutil
+import tempfile
+from runner import (
+    ScenarioRun, strip_args, warm_compile_cache, report, RUNNER_VALUE_ARGS,
+    RUNNER_FLAG_ARGS
+)
+
+# Every scenario with the scenario it builds on and the framework state it
+# produces. A scenario is only played out as a dependency if the state it
+# produces is missing, and this state is what a checkpoint saves.
+SCENARIO_GRAPH = {
+    'none': (None, []),
+    'deploy': (
+        None,
+        ['dao_creator_addr', 'dao_addr', 'offer_addr', 'closing_time']
+    ),
+    'fund': ('deploy', ['total_supply', 'token_amounts']),
+    'proposal': ('fund', ['prop_id', 'offer_amount']),
+    'rewards': (
+        'proposal',
+        [
+            'dao_balance_after_rewards', 'dao_rewardToken_after_rewards',
+            'reward_input_after_rewards'
+        ]
+    ),
+    'split': ('rewards', []),
+    'split-insufficient-gas': ('rewards', []),
+    'proposals-load': ('fund', []),
+    'split-load': ('rewards', []),
+    'rewards-load': ('rewards', []),
+    'transfers-load': ('rewards', []),
+}
+
+
+def dependency(scenario):
+    return SCENARIO_GRAPH[scenario][0]
+
+
+def produced_state(scenario):
+    return SCENARIO_GRAPH[scenario][1]
+
+
+def dependency_chain(scenario):
+    """Return the scenarios leading to `scenario` and itself, in order"""
+    chain = []
+    while scenario:
+        chain.insert(0, scenario)
+        scenario = dependency(scenario)
+    return chain
+
+
+def plan_runs(scenarios):
+    """
+    Split the scenarios needed for a set of requested ones into runs that
+    each fork from the checkpoint of an earlier run. A run ends at every
+    requested scenario and at every scenario that several of the needed
+    ones build on, so that shared prefixes are played out once. Returns a
+    list of (scenario, forked scenario or None) tuples in an order in which
+    every run comes after the one it forks from.
+    """
+    needed = set()
+    for scenario in scenarios:
+        needed.update(dependency_chain(scenario))
+    dependents = {}
+    for scenario in needed:
+        if dependency(scenario):
+            dependents.setdefault(dependency(scenario), set()).add(scenario)
+    ends = set(scenarios) | set(
+        s for s in needed if len(dependents.get(s, ())) > 1
+    )
+    result = []
+    # shorter chains first, so that a run comes after the one it forks from
+    for scenario in sorted(ends, key=lambda s: (len(dependency_chain(s)), s)):
+        fork = dependency(scenario)
+        while fork and fork not in ends:
+            fork = dependency(fork)
+        result.append((scenario, fork))
+    return result
+
+
+def checkpoints_dir(args):
+    """
+    Directory for the checkpoints the runs fork from, and whether it is a
+    temporary one. Runs forking from --from-checkpoint need its directory.
+    """
+    if args.checkpoint_dir:
+        return args.checkpoint_dir, False
+    if args.from_checkpoint:
+        tests_dir = os.path.dirname(os.path.realpath(__file__))
+        return os.path.join(tests_dir, 'checkpoints'), False
+    return tempfile.mkdtemp(prefix='dao-prefixes-'), True
+
+
+def run_scheduled(args, argv):
+    """
+    Play out all scenarios given with --scenarios, up to --jobs of them at
+    the same time, and return the exit code of the whole run. On geth a
+    prefix shared by several scenarios runs once and the scenarios fan out
+    from its checkpoint. The tester backend has no checkpoints, so there
+    every scenario is played out from scratch.
+    """
+    requested = args.scenarios.split(',')
+    base_argv = strip_args(argv, RUNNER_VALUE_ARGS, RUNNER_FLAG_ARGS)
+    warm_compile_cache(args, base_argv)
+
+    if args.backend == 'tester':
+        plan = [(scenario, None) for scenario in requested]
+        memo_dir, temporary = None, False
+    else:
+        plan = plan_runs(requested)
+        memo_dir, temporary = checkpoints_dir(args)
+        base_argv = strip_args(
+            base_argv, ['--checkpoint-dir'], ['--checkpoint']
+        ) + ['--checkpoint', '--checkpoint-dir', memo_dir]
+
+    runs = []
+    for i, (scenario, fork) in enumerate(plan):
+        run = ScenarioRun(scenario, i + 1, args, base_argv, fork=fork)
+        if scenario not in requested:
+            run.label = '{} (prefix)'.format(scenario)
+        run.fork = fork
+        runs.append(run)
+    by_scenario = dict((run.scenario, run) for run in runs)
+
+    pending = list(runs)
+    running = []
+    start = time.time()
+    while pending or running:
+        for run in list(pending):
+            parent = by_scenario.get(run.fork)
+            done = parent and parent.proc is not None and parent.finished()
+            if parent and (parent.skipped or (done and not parent.passed())):
+                pending.remove(run)
+                run.skipped = True
+                print("Skipping scenario '{}' since '{}' did not pass".format(
+                    run.label, parent.label
+                ))
+                continue
+            if parent and not done:
+                # the run it forks from has not finished yet
+                continue
+            if len(running) >= args.jobs:
+                break
+            pending.remove(run)
+            print("Starting scenario '{}'{} in {}".format(
+                run.label,
+                " from checkpoint '{}'".format(run.fork) if run.fork else '',
+                run.work_dir
+            ))
+            run.start()
+            running.append(run)
+        for run in list(running):
+            if run.finished():
+                running.remove(run)
+                print("Scenario '{}' {} after {:.1f} seconds".format(
+                    run.label,
+                    "PASSED" if run.passed() else "FAILED",
+                    run.duration
+                ))
+        time.sleep(0.2)
+
+    report(runs, time.time() - start)
+    for run in runs:
+        if run.passed() or run.skipped:
+            shutil.rmtree(run.work_dir, ignore_errors=True)
+    if temporary:
+        shutil.rmtree(memo_dir, ignore_errors=True)
+    return 0 if all(r.passed() for r in runs) else 1
@@ -1,40 +1,42 @@
 var _defaultServiceProvider = web3.eth.accounts[0];
-var daoContract = web3.eth.contract($dao_abi);
+
+// contract creation callbacks rely on filter polling which does not happen
+// while a script is evaluated through `geth attach`, so read the created
+// addresses from the transaction receipts instead
+function createdAddress(contract) {
+    var receipt = eth.getTransactionReceipt(contract.transactionHash);
+    return receipt ? receipt.contractAddress : undefined;
+}
+
 console.log("Creating DAOCreator Contract");
-var creatorContract = web3.eth.contract($creator_abi);
 var _daoCreatorContract = creatorContract.new(
     {
-	from: web3.eth.accounts[0],
-	data: '$creator_bin',
-	gas: 3000000
-    }, function (e, contract){
-	if (e) {
-            console.log(e+" at DAOCreator creation!");
-	} else if (typeof contract.address != 'undefined') {
-        addToTest('dao_creator_address', contract.address);
-        checkWork();
-        var dao = daoContract.new(
-		    _defaultServiceProvider,
-		    contract.address,
-		    $min_value,
-		    $closing_time,
-            0,
-		    {
-		        from: web3.eth.accounts[0],
-		        data: '$dao_bin',
-		        gas: 4000000
-		    }, function (e, contract) {
-		        // funny thing, without this geth hangs
-		        console.log("At DAO creation callback");
-		        if (typeof contract.address != 'undefined') {
-                    addToTest('dao_address', contract.address);
-		        }
-		    });
-        checkWork();
-	}
-    });
+        from: web3.eth.accounts[0],
+        data: creatorBin,
+        gas: txGas.DAO_Creator
+    }
+);
+track(_daoCreatorContract.transactionHash, 'DAO_Creator');
 checkWork();
-var offerContract = web3.eth.contract($offer_abi);
+var _daoCreatorAddress = createdAddress(_daoCreatorContract);
+if (typeof _daoCreatorAddress == 'undefined') {
+    console.log("DAOCreator was not mined!");
+} else {
+    addToTest('dao_creator_address', _daoCreatorAddress);
+    var dao = daoContract.new(
+        _defaultServiceProvider,
+        _daoCreatorAddress,
+        $min_value,
+        $closing_time,
+        0,
+        {
+            from: web3.eth.accounts[0],
+            data: daoBin,
+            gas: txGas.DAO
+        }
+    );
+    track(dao.transactionHash, 'DAO');
+}
 var offer = offerContract.new(
     _defaultServiceProvider, //service provider
     '0x0',  // This is a hash of the paper contract. Does not matter for testing
@@ -44,23 +46,18 @@ var offer = offerContract.new(
     web3.toWei(1, "ether"), //reward divison
     web3.toWei(1, "ether"), //deployment rewards
     {
-	    from: web3.eth.accounts[0],
-	    data: '$offer_bin',
-	    gas: 3000000
-    }, function (e, contract) {
-	    if (e) {
-            console.log(e + " at Offer Contract creation!");
-	    } else if (typeof contract.address != 'undefined') {
-            addToTest('offer_address', contract.address);
-        }
+        from: web3.eth.accounts[0],
+        data: offerBin,
+        gas: txGas.SampleOffer
     }
 );
+track(offer.transactionHash, 'SampleOffer');
+console.log("mining contracts, please wait");
 checkWork();
-console.log("mining contract, please wait");
-miner.start(1);
-setTimeout(function() {
-    miner.stop(0);
-    testResults();
-}, 3000);
-
-
+if (typeof dao != 'undefined' && typeof createdAddress(dao) != 'undefined') {
+    addToTest('dao_address', createdAddress(dao));
+}
+if (typeof createdAddress(offer) != 'undefined') {
+    addToTest('offer_address', createdAddress(offer));
+}
+testResults();
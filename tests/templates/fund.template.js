@@ -1,40 +1,42 @@
 var amounts = $amounts;
 
-var dao = web3.eth.contract($dao_abi).at('$dao_address');
+var dao = daoContract.at('$dao_address');
 console.log("Buying DAO tokens");
+var purchases = [];
 for (i = 0; i < eth.accounts.length; i++) {
-    web3.eth.sendTransaction({
+    purchases.push({
         from:eth.accounts[i],
         to: dao.address,
-        gas:200000,
+        gas: txGas.fallback,
         value:web3.toWei(amounts[i], "ether")
     });
 }
+sendBatch(purchases, 'fallback');
 
 checkWork();
 
-setTimeout(function() {
-    miner.stop(0);
-    addToTest('dao_funded', dao.isFunded());
-    addToTest('total_supply', parseInt(web3.fromWei(dao.totalSupply())));
-    var balances = [];
-    for (i = 0; i < eth.accounts.length; i++) {
-        balances.push(parseInt(web3.fromWei(dao.balanceOf(eth.accounts[i]))));
-    }
-    addToTest('balances', balances);
+console.log("Wait for end of sale");
+mineFor($wait_secs);
 
-    // now also try to purchase some extra tokens after the sale ended
-    web3.eth.sendTransaction({
-        from:eth.accounts[0],
-        to: dao.address,
-        gas:200000,
-        value:web3.toWei(20, "ether")
-    });
-    // and confirm balance is still the same
-    checkWork();
-    addToTest('user0_after', parseInt(web3.fromWei(dao.balanceOf(eth.accounts[0]))));
+addToTest('dao_funded', dao.isFunded());
+addToTest('total_supply', parseInt(web3.fromWei(dao.totalSupply())));
+// with an event index the harness answers the balances from it
+if (!$from_index) {
+    var balances = readAccounts(dao, 'balanceOf', eth.accounts);
+    addToTest('balances', balances.map(function (balance) {
+        return parseInt(web3.fromWei(balance));
+    }));
+}
 
-    testResults();
-}, $wait_ms);
-console.log("Wait for end of sale");
-miner.start(1);
+// now also try to purchase some extra tokens after the sale ended
+track(web3.eth.sendTransaction({
+    from:eth.accounts[0],
+    to: dao.address,
+    gas: txGas.fallback,
+    value:web3.toWei(20, "ether")
+}), 'fallback');
+// and confirm balance is still the same
+checkWork();
+addToTest('user0_after', parseInt(web3.fromWei(dao.balanceOf(eth.accounts[0]))));
+
+testResults();
@@ -1,14 +1,13 @@
-var dao = web3.eth.contract($dao_abi).at('$dao_address');
-var offer = web3.eth.contract($offer_abi).at('$offer_address');
+var dao = daoContract.at('$dao_address');
+var offer = offerContract.at('$offer_address');
 
 console.log("Add offer contract as allowed recipient");
-dao.addAllowedAddress.sendTransaction('$offer_address', {from: serviceProvider, gas: 1000000});
+track(dao.addAllowedAddress.sendTransaction('$offer_address', {from: serviceProvider, gas: txGas.addAllowedAddress}), 'addAllowedAddress');
 checkWork();
 
 addToTest('creator_balance_before', web3.fromWei(eth.getBalance(proposalCreator)));
 console.log("Creating a new proposal for $offer_amount ether.");
-var tx_hash = null;
-dao.newProposal.sendTransaction(
+var tx_hash = track(dao.newProposal.sendTransaction(
     '$offer_address',
     web3.toWei($offer_amount, "ether"),
     '$offer_desc',
@@ -18,17 +17,10 @@ dao.newProposal.sendTransaction(
     {
         from: proposalCreator,
         value: web3.toWei($proposal_deposit, "ether"),
-        gas: 1000000
+        gas: txGas.newProposal
     }
-    , function (e, res) {
-        if (e) {
-            console.log(e + "at newProposal()!");
-        } else {
-            tx_hash = res;
-            console.log("newProposal tx hash is: " + tx_hash);
-        }
-    }
-);
+), 'newProposal');
+console.log("newProposal tx hash is: " + tx_hash);
 checkWork();
 
 addToTest('creator_balance_after_proposal', web3.fromWei(eth.getBalance(proposalCreator)));
@@ -42,45 +34,42 @@ var votes = $votes;
 var prop_id = 1;
 
 console.log("Deadline is: " + dao.proposals(prop_id)[3] + " Voting ... ");
+var voteTxs = [];
 for (i = 0; i < votes.length; i++) {
-    console.log("User " + i +" is voting ["+ votes[i] +"]. His token balance is: " + web3.fromWei(dao.balanceOf(eth.accounts[i])) + " ether and NOW is: " + Math.floor(Date.now() / 1000));
-    dao.vote.sendTransaction(
-        prop_id,
-        votes[i],
-        {
-            from: eth.accounts[i],
-            gas: 1000000
-        }
-    );
+    voteTxs.push({
+        from: eth.accounts[i],
+        to: dao.address,
+        data: dao.vote.getData(prop_id, votes[i]),
+        gas: txGas.vote
+    });
 }
+sendBatch(voteTxs, 'vote');
 checkWork();
 addToTest('proposal_yay', parseInt(web3.fromWei(dao.proposals(prop_id)[9])));
 addToTest('proposal_nay', parseInt(web3.fromWei(dao.proposals(prop_id)[10])));
 addToTest('provider_balance_before', web3.fromWei(eth.getBalance(serviceProvider)));
 
-setTimeout(function() {
-    miner.stop(0);
-    console.log("After debating period. NOW is: " + Math.floor(Date.now() / 1000));
-    console.log("Executing proposal ...");
-    dao.executeProposal.sendTransaction(prop_id, '$transaction_bytecode', {from:serviceProvider, gas:1000000});
-    checkWork();
+console.log("Wait for end of debating period");
+mineFor($debating_period);
 
-    // 5th member of the structure is proposalPassed
-    addToTest('proposal_passed', dao.proposals(prop_id)[5]);
-    addToTest('creator_balance_after_execution', web3.fromWei(eth.getBalance(proposalCreator)));
-    addToTest('provider_balance_after', web3.fromWei(eth.getBalance(serviceProvider)));
+console.log("After debating period. NOW is: " + Math.floor(Date.now() / 1000));
+console.log("Executing proposal ...");
+track(dao.executeProposal.sendTransaction(prop_id, '$transaction_bytecode', {from:serviceProvider, gas: txGas.executeProposal}), 'executeProposal');
+checkWork();
 
-    addToTest(
-        'onetime_costs',
-        bigDiffRound(testMap['provider_balance_after'], testMap['provider_balance_before'])
-    );
-    addToTest(
-        'deposit_returned',
-        Math.round(testMap['creator_balance_after_execution']) == Math.round(testMap['creator_balance_before'])
-    );
-    addToTest('offer_promise_valid', offer.promiseValid());
+// 5th member of the structure is proposalPassed
+addToTest('proposal_passed', dao.proposals(prop_id)[5]);
+addToTest('creator_balance_after_execution', web3.fromWei(eth.getBalance(proposalCreator)));
+addToTest('provider_balance_after', web3.fromWei(eth.getBalance(serviceProvider)));
 
-    testResults();
-}, $debating_period * 1000);
-console.log("Wait for end of debating period");
-miner.start(1);
+addToTest(
+    'onetime_costs',
+    bigDiffRound(testMap['provider_balance_after'], testMap['provider_balance_before'])
+);
+addToTest(
+    'deposit_returned',
+    Math.round(testMap['creator_balance_after_execution']) == Math.round(testMap['creator_balance_before'])
+);
+addToTest('offer_promise_valid', offer.promiseValid());
+
+testResults();
@@ -0,0 +1,157 @@
+var dao = daoContract.at('$dao_address');
+var periods = $periods;
+var votes = $votes;
+var holders = eth.accounts.length;
+var firstId = dao.numberOfProposals().toNumber() + 1;
+
+console.log("Opening " + periods.length + " proposals ...");
+var proposalTxs = [];
+for (j = 0; j < periods.length; j++) {
+    proposalTxs.push({
+        from: eth.accounts[j % holders],
+        to: dao.address,
+        data: dao.newProposal.getData(
+            serviceProvider, 0, 'Load proposal ' + j, '', periods[j], false
+        ),
+        value: web3.toWei($proposal_deposit, "ether"),
+        gas: txGas.newProposal
+    });
+}
+sendBatch(proposalTxs, 'newProposal');
+checkWork();
+var opened = dao.numberOfProposals().toNumber() - firstId + 1;
+addToTest('opened_proposals', opened);
+
+// proposal ids follow the order of inclusion, so map them back to the
+// proposals by their description
+var proposalIds = [];
+var ids = [];
+for (id = firstId; id < firstId + opened; id++) {
+    ids.push(id);
+}
+batchCalls(ids.map(function (id) {
+    return callRequest(dao, 'proposals', [id]);
+})).forEach(function (proposal, k) {
+    proposalIds[parseInt(proposal[2].split(' ').pop())] = ids[k];
+});
+
+console.log("Voting on the proposals ...");
+var voteTxs = [];
+for (i = 0; i < holders; i++) {
+    for (j = 0; j < votes.length; j++) {
+        if (votes[j][i] !== null) {
+            voteTxs.push({
+                from: eth.accounts[i],
+                to: dao.address,
+                data: dao.vote.getData(proposalIds[j], votes[j][i]),
+                gas: txGas.vote
+            });
+        }
+    }
+}
+sendBatch(voteTxs, 'vote');
+checkWork();
+
+var proposals = batchCalls(proposalIds.map(function (id) {
+    return callRequest(dao, 'proposals', [id]);
+}));
+var deadlines = proposals.map(function (proposal) {
+    return proposal[3].toNumber();
+});
+// with an event index the harness answers the vote totals and the final
+// balances from it
+if (!$from_index) {
+    addToTest('proposal_yay', proposals.map(function (proposal) {
+        return proposal[9].toString(10);
+    }));
+    addToTest('proposal_nay', proposals.map(function (proposal) {
+        return proposal[10].toString(10);
+    }));
+}
+
+// a voter is blocked by the proposal with the latest deadline it voted on
+var blocked = readAccounts(dao, 'isBlocked', eth.accounts);
+var blockers = readAccounts(dao, 'blocked', eth.accounts);
+var deadlineOf = {};
+proposalIds.forEach(function (id, j) {
+    deadlineOf[id] = deadlines[j];
+});
+// deadlines of blocking proposals opened before this scenario
+var otherBlockers = [];
+blockers.forEach(function (blocker) {
+    var id = blocker.toNumber();
+    if (id != 0 && !(id in deadlineOf) && otherBlockers.indexOf(id) == -1) {
+        otherBlockers.push(id);
+    }
+});
+batchCalls(otherBlockers.map(function (id) {
+    return callRequest(dao, 'proposals', [id]);
+})).forEach(function (proposal, k) {
+    deadlineOf[otherBlockers[k]] = proposal[3].toNumber();
+});
+var blockedByLatest = true;
+for (i = 0; i < holders; i++) {
+    var blocker = blockers[i].toNumber();
+    for (j = 0; j < votes.length; j++) {
+        if (votes[j][i] !== null && (blocker == 0
+            || deadlines[j] > deadlineOf[blocker])) {
+            blockedByLatest = false;
+        }
+    }
+}
+addToTest('blocked', blocked);
+addToTest('blocked_by_latest', blockedByLatest);
+
+// every holder moves one unit of its tokens to the DAO, which fails for
+// the ones that are blocked
+function transferAll() {
+    var transferTxs = [];
+    for (i = 0; i < holders; i++) {
+        transferTxs.push({
+            from: eth.accounts[i],
+            to: dao.address,
+            data: dao.transfer.getData(dao.address, 1),
+            gas: txGas.transfer
+        });
+    }
+    sendBatch(transferTxs, 'transfer');
+    checkWork();
+}
+
+function tokenBalances() {
+    return decimalStrings(readAccounts(dao, 'balanceOf', eth.accounts));
+}
+
+console.log("Transferring tokens while the proposals are open ...");
+transferAll();
+addToTest('balances_while_blocked', tokenBalances());
+
+console.log("Wait for the end of the longest debating period");
+var lastDeadline = Math.max.apply(null, deadlines);
+mineFor(Math.max(0, lastDeadline - Math.floor(Date.now() / 1000)) + 2);
+
+console.log("Executing the proposals ...");
+var executeTxs = [];
+for (j = 0; j < proposalIds.length; j++) {
+    executeTxs.push({
+        from: serviceProvider,
+        to: dao.address,
+        data: dao.executeProposal.getData(proposalIds[j], ''),
+        gas: txGas.executeProposal
+    });
+}
+sendBatch(executeTxs, 'executeProposal');
+checkWork();
+var passed = [];
+for (j = 0; j < proposalIds.length; j++) {
+    passed.push(dao.proposals(proposalIds[j])[5]);
+}
+addToTest('proposals_passed', passed);
+
+console.log("Transferring tokens after the proposals were executed ...");
+transferAll();
+if (!$from_index) {
+    addToTest('balances_after', tokenBalances());
+}
+
+testResults();
@@ -0,0 +1,97 @@
+var dao = daoContract.at('$dao_address');
+var rewardAccount = managedAccountContract.at(dao.rewardAccount());
+var rounds = $rounds;
+var holders = eth.accounts.length;
+
+// the account that transfers tokens on behalf of holder i
+function spenderOf(i) {
+    return eth.accounts[(i + 1) % holders];
+}
+
+function countFailed(hashes) {
+    return hashes.filter(function (hash) {
+        return txStatus({hash: hash}, eth.getTransactionReceipt(hash)) != 'ok';
+    }).length;
+}
+
+console.log("Approving the transfers through allowances ...");
+var approveTxs = [];
+for (i = 0; i < holders; i++) {
+    approveTxs.push({
+        from: eth.accounts[i],
+        to: dao.address,
+        data: dao.approve.getData(spenderOf(i), '$allowance'),
+        gas: txGas.approve
+    });
+}
+sendBatch(approveTxs, 'approve');
+checkWork();
+
+for (r = 0; r < rounds.length; r++) {
+    var round = rounds[r];
+    var prefix = 'round' + (r + 1) + '_';
+
+    console.log("Donating to the reward account, round " + (r + 1) + " ...");
+    track(eth.sendTransaction({
+        from: eth.accounts[round.donor],
+        to: rewardAccount.address,
+        value: round.donation,
+        gas: txGas.donation
+    }), 'donation');
+    checkWork();
+    addToTest(prefix + 'accumulated_input', rewardAccount.accumulatedInput().toString(10));
+
+    console.log("Withdrawing rewards ...");
+    var start = Date.now();
+    var hashes = sendBatch(round.withdrawers.map(function (i) {
+        return {
+            from: eth.accounts[i],
+            to: dao.address,
+            data: dao.getMyReward.getData(),
+            gas: txGas.getMyReward
+        };
+    }), 'getMyReward');
+    checkWork();
+    reportThroughput('getMyReward', start, round.withdrawers.length);
+    addToTest(prefix + 'withdrawals_failed', countFailed(hashes));
+
+    console.log("Transferring tokens between withdrawals ...");
+    // both kinds go out together, each with its own gas and label
+    var transferTxs = [];
+    var transferFromTxs = [];
+    round.transfers.forEach(function (transfer) {
+        var to = eth.accounts[transfer[1]];
+        if (transfer[3]) {
+            transferFromTxs.push({
+                from: spenderOf(transfer[0]),
+                to: dao.address,
+                data: dao.transferFrom.getData(eth.accounts[transfer[0]], to, transfer[2]),
+                gas: txGas.transferFrom
+            });
+        } else {
+            transferTxs.push({
+                from: eth.accounts[transfer[0]],
+                to: dao.address,
+                data: dao.transfer.getData(to, transfer[2]),
+                gas: txGas.transfer
+            });
+        }
+    });
+    start = Date.now();
+    sendBatch(transferTxs, 'transfer');
+    sendBatch(transferFromTxs, 'transferFrom');
+    checkWork();
+    reportThroughput('transfer', start, transferTxs.length);
+    reportThroughput('transferFrom', start, transferFromTxs.length);
+
+    var paidOut = readAccounts(dao, 'paidOut', eth.accounts);
+    var total = paidOut.reduce(function (sum, paid) {
+        return sum.plus(paid);
+    }, web3.toBigNumber(0));
+    addToTest(prefix + 'paid_out', decimalStrings(paidOut));
+    addToTest(prefix + 'total_paid_out', total.toString(10));
+    addToTest(prefix + 'within_input', total.lte(rewardAccount.accumulatedInput()));
+    addToTest(prefix + 'balances', decimalStrings(readAccounts(dao, 'balanceOf', eth.accounts)));
+}
+
+testResults();
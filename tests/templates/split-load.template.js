@@ -0,0 +1,159 @@
+var levels = $levels;
+var daos = [daoContract.at('$dao_address')];
+
+// the transactions of all voters of a split calling splitDAO
+function splitTxs(level, s) {
+    var split = level.splits[s];
+    var parent = daos[split.parent];
+    return split.voters.map(function (i) {
+        return {
+            from: eth.accounts[i],
+            to: parent.address,
+            data: parent.splitDAO.getData(
+                split.proposalId, eth.accounts[split.recipient]
+            ),
+            gas: $split_gas
+        };
+    });
+}
+
+function balancesOf(d, holders) {
+    return decimalStrings(readAccounts(d, 'balanceOf', holders.map(function (i) {
+        return eth.accounts[i];
+    })));
+}
+
+// a query of the split data of every split of a level, in one batch
+function splitQuery(level, name) {
+    return batchCalls(level.splits.map(function (split) {
+        return callRequest(daos[split.parent], name, [split.proposalId, 0]);
+    }));
+}
+
+for (L = 0; L < levels.length; L++) {
+    var level = levels[L];
+    var suffix = ' (level ' + (L + 1) + ')';
+    var prefix = 'level' + (L + 1) + '_';
+
+    // DAOs created by a split only take proposals once their sale is over
+    var closing = Math.max.apply(null, daos.map(function (d) {
+        return d.closingTime().toNumber();
+    }));
+    var now = Math.floor(Date.now() / 1000);
+    if (closing >= now) {
+        console.log("Wait for the token sale of the new DAOs to end");
+        mineFor(closing - now + 2);
+    }
+    var start = Date.now();
+    var startBlock = eth.blockNumber;
+
+    console.log("Opening " + level.splits.length + " split proposals" + suffix + " ...");
+    var firstIds = daos.map(function (d) {
+        return d.numberOfProposals().toNumber() + 1;
+    });
+    sendBatch(level.splits.map(function (split, s) {
+        var parent = daos[split.parent];
+        return {
+            from: eth.accounts[split.voters[0]],
+            to: parent.address,
+            data: parent.newProposal.getData(
+                eth.accounts[split.recipient], 0, 'Split ' + s, '',
+                $debating_period, true
+            ),
+            gas: txGas.newProposal
+        };
+    }), 'newProposal' + suffix);
+    checkWork();
+    // map the proposal ids back to the splits by their description
+    var lastIds = batchCalls(daos.map(function (d) {
+        return callRequest(d, 'numberOfProposals', []);
+    }));
+    var requests = [];
+    var ids = [];
+    daos.forEach(function (d, p) {
+        for (id = firstIds[p]; id <= lastIds[p].toNumber(); id++) {
+            requests.push(callRequest(d, 'proposals', [id]));
+            ids.push(id);
+        }
+    });
+    batchCalls(requests).forEach(function (proposal, k) {
+        level.splits[parseInt(proposal[2].split(' ').pop())].proposalId = ids[k];
+    });
+
+    console.log("Voting for the split proposals" + suffix + " ...");
+    var voteTxs = [];
+    level.splits.forEach(function (split) {
+        var parent = daos[split.parent];
+        split.voters.forEach(function (i) {
+            voteTxs.push({
+                from: eth.accounts[i],
+                to: parent.address,
+                data: parent.vote.getData(split.proposalId, true),
+                gas: txGas.vote
+            });
+        });
+    });
+    sendBatch(voteTxs, 'vote' + suffix);
+    checkWork();
+
+    console.log("Wait for end of debating period");
+    mineFor($debating_period);
+
+    // The first splitDAO call of a proposal creates the new DAO and records
+    // the state of the old one, which the funds of all its voters are moved
+    // by. Splits of the same DAO therefore run one round after the other,
+    // while splits of different DAOs share a round.
+    var rounds = Math.max.apply(null, level.splits.map(function (split) {
+        return split.round;
+    })) + 1;
+    for (r = 0; r < rounds; r++) {
+        console.log("Splitting, round " + (r + 1) + " of " + rounds + suffix + " ...");
+        var createTxs = [];
+        var joinTxs = [];
+        level.splits.forEach(function (split, s) {
+            if (split.round == r) {
+                var txs = splitTxs(level, s);
+                createTxs.push(txs[0]);
+                joinTxs = joinTxs.concat(txs.slice(1));
+            }
+        });
+        sendBatch(createTxs, 'splitDAO create' + suffix);
+        checkWork();
+        if (joinTxs.length > 0) {
+            sendBatch(joinTxs, 'splitDAO' + suffix);
+            checkWork();
+        }
+    }
+    reportTiming('split_level_' + (L + 1), start, eth.blockNumber - startBlock);
+
+    var children = splitQuery(level, 'splitProposalNewAddress').map(function (address) {
+        return daoContract.at(address);
+    });
+    addToTest(prefix + 'new_daos', children.filter(function (c) {
+        return parseInt(c.address, 16) != 0;
+    }).length);
+    addToTest(prefix + 'split_balance', decimalStrings(splitQuery(level, 'splitProposalBalance')));
+    addToTest(prefix + 'split_supply', decimalStrings(splitQuery(level, 'splitProposalSupply')));
+    addToTest(prefix + 'split_reward_token', decimalStrings(splitQuery(level, 'splitProposalrewardToken')));
+    addToTest(prefix + 'parent_balances', daos.map(function (d, p) {
+        return balancesOf(d, level.parents[p]);
+    }));
+    addToTest(prefix + 'parent_eth', decimalStrings(batchCalls(daos.map(function (d) {
+        return eth.getBalance.request(d.address);
+    }))));
+    addToTest(prefix + 'parent_reward_token', decimalStrings(batchCalls(daos.map(function (d) {
+        return callRequest(d, 'rewardToken', [d.address]);
+    }))));
+    addToTest(prefix + 'child_balances', children.map(function (c, s) {
+        return balancesOf(c, level.splits[s].voters);
+    }));
+    addToTest(prefix + 'child_supply', decimalStrings(batchCalls(children.map(function (c) {
+        return callRequest(c, 'totalSupply', []);
+    }))));
+    addToTest(prefix + 'child_reward_token', decimalStrings(batchCalls(level.splits.map(function (split, s) {
+        return callRequest(daos[split.parent], 'rewardToken', [children[s].address]);
+    }))));
+    daos = children;
+}
+
+testResults();
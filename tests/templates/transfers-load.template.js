@@ -0,0 +1,103 @@
+var dao = daoContract.at('$dao_address');
+var votes = $votes;
+var batches = $batches;
+var holders = eth.accounts.length;
+
+// the account that transfers tokens on behalf of holder i
+function spenderOf(i) {
+    return eth.accounts[(i + 1) % holders];
+}
+
+function transferTx(variant, sender, receiver, value) {
+    var from = eth.accounts[sender];
+    var to = eth.accounts[receiver];
+    var tx = {to: dao.address, gas: txGas[variant]};
+    if (variant == 'transfer' || variant == 'transferWithoutReward') {
+        tx.from = from;
+        tx.data = dao[variant].getData(to, value);
+    } else {
+        tx.from = spenderOf(sender);
+        tx.data = dao[variant].getData(from, to, value);
+    }
+    return tx;
+}
+
+function countFailed(hashes) {
+    return hashes.filter(function (hash) {
+        return !(hash instanceof Error)
+            && txStatus({hash: hash}, eth.getTransactionReceipt(hash)) != 'ok';
+    }).length;
+}
+
+console.log("Opening a proposal that blocks its voters ...");
+var firstVoter = eth.accounts[votes[0][0]];
+track(dao.newProposal.sendTransaction(
+    serviceProvider, 0, 'Blocking proposal', '', $debating_period, false,
+    {
+        from: firstVoter,
+        value: web3.toWei($proposal_deposit, "ether"),
+        gas: txGas.newProposal
+    }
+), 'newProposal');
+checkWork();
+var proposalId = dao.numberOfProposals().toNumber();
+sendBatch(votes.map(function (vote) {
+    return {
+        from: eth.accounts[vote[0]],
+        to: dao.address,
+        data: dao.vote.getData(proposalId, vote[1]),
+        gas: txGas.vote
+    };
+}), 'vote');
+checkWork();
+
+console.log("Approving the transfers through allowances ...");
+var start = Date.now();
+var approveTxs = [];
+for (i = 0; i < holders; i++) {
+    approveTxs.push({
+        from: eth.accounts[i],
+        to: dao.address,
+        data: dao.approve.getData(spenderOf(i), '$allowance'),
+        gas: txGas.approve
+    });
+}
+sendBatch(approveTxs, 'approve');
+checkWork();
+reportThroughput('approve', start, holders);
+
+// All kinds of transfers of a batch go out together, so the throughput of
+// each kind is the share of the mixed load it was confirmed at.
+var failed = 0;
+for (b = 0; b < batches.length; b++) {
+    console.log("Sending transfer batch " + (b + 1) + " of " + batches.length + " ...");
+    var byVariant = {};
+    batches[b].forEach(function (transfer) {
+        var variant = transfer[0];
+        (byVariant[variant] = byVariant[variant] || []).push(
+            transferTx(variant, transfer[1], transfer[2], transfer[3])
+        );
+    });
+    start = Date.now();
+    var startBlock = eth.blockNumber;
+    var hashes = [];
+    for (variant in byVariant) {
+        hashes = hashes.concat(sendBatch(byVariant[variant], variant));
+    }
+    checkWork();
+    for (variant in byVariant) {
+        reportThroughput(variant, start, byVariant[variant].length);
+    }
+    reportTiming('transfer_batch', start, eth.blockNumber - startBlock);
+    failed += countFailed(hashes);
+}
+
+addToTest('blocked', readAccounts(dao, 'isBlocked', eth.accounts));
+addToTest('failed_transfers', failed);
+// with an event index the harness answers the balances from it
+if (!$from_index) {
+    addToTest('balances', decimalStrings(readAccounts(dao, 'balanceOf', eth.accounts)));
+}
+addToTest('paid_out', decimalStrings(readAccounts(dao, 'paidOut', eth.accounts)));
+
+testResults();
@@ -8,6 +8,7 @@ import json
 import subprocess
 import shutil
 import sys
+import tempfile
 from datetime import datetime
 from string import Template
 import re
@@ -15,26 +16,101 @@ import random
 from utils import (
     constrained_sum_sample_pos, rm_file, determine_binary, ts_now,
     seconds_in_future, create_votes_array, arr_str, eval_test, write_js,
-    count_token_votes, create_genesis, calculate_reward, tokens_after_split,
-    calculate_closing_time, extract_test_dict, edit_dao_source
+    create_genesis, calculate_closing_time, read_results, edit_dao_source,
+    load_genesis_profile, instant_seal_profile, ResultChannel, RESULT_PREFIX
 )
 from args import test_args
+from compile_cache import CompileCache, sources_revision
+from node import GethNode
+from tester_backend import TesterBackend
+from checkpoint import save_checkpoint, load_checkpoint
+from scheduler import run_scheduled, dependency_chain, produced_state
+from fuzz import run_fuzz, fuzz_config, apply_config
+from keygen import generate_accounts, derive_keys, ACCOUNT_PASSWORD
+from profiling import GasProfile, LoadReport, size_for_throughput
+from timing import PhaseTimer
+from jsutils import js_artifacts
+from indexer import EventIndex
+from accounting import (
+    to_wei, wei_strings, tally_votes, rewards_for, split_dao, withdraw_rewards,
+    transfer_tokens, WEI_PER_ETHER
+)
 
 
 class TestContext():
+    # framework state that is saved along with a chain checkpoint: the
+    # accounts and the state produced by the scenarios
+    CHECKPOINT_FIELDS = ['accounts'] + [
+        field
+        for scenario in dependency_chain('rewards')
+        for field in produced_state(scenario)
+    ]
+    # the kinds of transfers of the transfers-load scenario and how often
+    # each is picked relative to the others
+    TRANSFER_MIX = [
+        ('transfer', 4),
+        ('transferFrom', 2),
+        ('transferWithoutReward', 1),
+        ('transferFromWithoutReward', 1)
+    ]
+
     def __init__(self, args):
         self.args = args
+        self.timer = PhaseTimer()
+        # every random choice of a run is drawn from this generator, so that
+        # the run can be played out again exactly with --seed
+        self.seed = args.seed
+        if self.seed is None:
+            self.seed = random.randint(0, 2**31)
+        print("Random seed: {}".format(self.seed))
+        self.rng = random.Random(self.seed)
         self.tests_ok = True
         self.dao_addr = None  # check to determine if DAO is deployed
         self.offer_addr = None  # check to determine if offer is deployed
         self.token_amounts = None  # check to determine if funding happened
         self.prop_id = None  # check to if we have ran proposal scenario
+        self.offer_amount = None  # ether sent by the proposal scenario
+        self.played = []  # scenarios played out in this run
         self.tests_dir = os.path.dirname(os.path.realpath(__file__))
-        self.save_file = os.path.join(self.tests_dir, "data", "saved")
+        self.work_dir = os.path.realpath(args.work_dir or os.getcwd())
+        self.data_dir = os.path.realpath(
+            args.data_dir or os.path.join(self.tests_dir, "data")
+        )
+        self.genesis_file = os.path.join(self.work_dir, "genesis_block.json")
+        self.save_file = os.path.join(self.data_dir, "saved")
+        self.artifacts_file = os.path.join(self.work_dir, "artifacts.js")
         self.templates_dir = os.path.join(self.tests_dir, 'templates')
         self.contracts_dir = os.path.dirname(self.tests_dir)
+        self.checkpoints_dir = args.checkpoint_dir or os.path.join(
+            self.tests_dir, 'checkpoints'
+        )
         self.solc = determine_binary(args.solc, 'solc')
         self.geth = determine_binary(args.geth, 'geth')
+        self.node = None
+        self.backend = None
+        self.compile_cache = None
+        self.gas_profile = None
+        if args.gas_profile:
+            self.gas_profile = GasProfile(args.users_num)
+            self.gas_profile.load(args.gas_profile)
+        self.event_index = None
+        self.load_report = None
+        if args.load_report:
+            self.load_report = LoadReport(args.scenario, self.load_scale(args))
+            self.load_report.load(args.load_report)
+        if self.solc and not args.no_compile_cache:
+            self.compile_cache = CompileCache(
+                args.compile_cache_dir or os.path.join(
+                    self.tests_dir, 'cache'
+                ),
+                self.solc,
+                args.compile_cache_size * 1024 * 1024
+            )
+
+        self.genesis_profile = load_genesis_profile(args.genesis_profile)
+        self.tx_gas = None
+        if args.throughput:
+            self.size_for_throughput(args)
 
         self.min_value = args.min_value
         self.test_scenarios = {
@@ -45,17 +121,52 @@ class TestContext():
             'rewards': self.run_test_rewards,
             'split': self.run_test_split,
             'split-insufficient-gas': self.run_test_split_insufficient_gas,
+            'proposals-load': self.run_test_proposals_load,
+            'split-load': self.run_test_split_load,
+            'rewards-load': self.run_test_rewards_load,
+            'transfers-load': self.run_test_transfers_load,
         }
 
         # keep this at end since any data loaded should override constructor
-        if args.clean_chain:
+        if args.backend == 'tester':
+            # the in-memory chain always starts from scratch
+            self.backend = TesterBackend(args.users_num)
+            self.accounts = self.backend.accounts
+        elif args.from_checkpoint:
+            self.restore_checkpoint(args.from_checkpoint)
+        elif args.clean_chain:
             self.clean_blockchain()
             self.create_accounts(args.users_num)
         else:
+            if args.accounts_seed:
+                # an existing chain created from the seed has these accounts
+                self.accounts = [a for _, a in derive_keys(
+                    args.accounts_seed, args.users_num
+                )]
             self.attemptLoad()
 
     def create_accounts(self, accounts_num):
         print("Creating accounts and genesis block ...")
+        with self.timer.phase('accounts'):
+            if self.args.accounts_seed:
+                self.accounts = generate_accounts(
+                    self.args.accounts_seed,
+                    accounts_num,
+                    os.path.join(self.data_dir, 'keystore')
+                )
+            else:
+                self.accounts = self.create_accounts_with_geth(accounts_num)
+        profile = self.genesis_profile
+        if self.args.mining == 'instant':
+            # the etherbase set by the scripts is the only clique signer
+            profile = instant_seal_profile(
+                profile, self.accounts[2], self.args.network_id
+            )
+        # creating genesis block with a generous allocation for all accounts
+        create_genesis(self.accounts, self.genesis_file, profile)
+        print("Done!")
+
+    def create_accounts_with_geth(self, accounts_num):
         with open(
                 os.path.join(self.templates_dir, 'accounts.template.js'),
                 'r'
@@ -63,13 +174,32 @@ class TestContext():
             data = f.read()
         tmpl = Template(data)
         s = tmpl.substitute(accounts_number=accounts_num)
-        with open('accounts.js', "w") as f:
+        with open(self.work_path('accounts.js'), "w") as f:
             f.write(s)
         output = self.run_script('accounts.js')
-        self.accounts = json.loads(output)
-        # creating genesis block with a generous allocation for all accounts
-        create_genesis(self.accounts)
-        print("Done!")
+        return json.loads(output)
+
+    def size_for_throughput(self, args):
+        """
+        Size the gas of the transactions and the block gas limit from the
+        gas usage measured in an earlier --gas-profile report
+        """
+        with open(args.throughput, 'r') as f:
+            report = json.loads(f.read())
+        self.tx_gas, gas_limit = size_for_throughput(
+            report, args.users_num, args.gas_headroom
+        )
+        self.genesis_profile['gas_limit'] = max(
+            self.genesis_profile['gas_limit'], gas_limit
+        )
+        print("Throughput mode: block gas limit {}, transaction gas {}".format(
+            self.genesis_profile['gas_limit'],
+            json.dumps(self.tx_gas, sort_keys=True)
+        ))
+
+    def work_path(self, name):
+        """Path of a file generated by the framework during the run"""
+        return os.path.join(self.work_dir, name)
 
     def next_proposal_id(self):
         self.prop_id += 1
@@ -90,52 +220,96 @@ class TestContext():
             print("Loaded dao_addr: {}".format(self.dao_addr))
             print("Loaded dao_creator_addr: {}".format(self.dao_creator_addr))
 
+    def checkpoint(self, name):
+        """
+        If requested, save a checkpoint of the chain and of the framework state
+        after scenario `name` so that later runs can fork from it
+        """
+        if not self.args.checkpoint:
+            return
+        # the node must be stopped for its database to be consistent on disk.
+        # It is restarted by the next script that needs it.
+        self.stop_node()
+        save_checkpoint(
+            self.checkpoints_dir,
+            name,
+            self.data_dir,
+            self.genesis_file,
+            dict((k, getattr(self, k, None)) for k in self.CHECKPOINT_FIELDS)
+        )
+
+    def restore_checkpoint(self, name):
+        state = load_checkpoint(
+            self.checkpoints_dir, name, self.data_dir, self.genesis_file
+        )
+        if state is None:
+            sys.exit(1)
+        for k, v in state.iteritems():
+            setattr(self, k, v)
+
     def clean_blockchain(self):
         """Clean all blockchain data directories apart from the keystore"""
         print("Cleaning blockchain data directory ...")
-        data_dir = os.path.join(self.tests_dir, "data")
+        data_dir = self.data_dir
         shutil.rmtree(os.path.join(data_dir, "chaindata"), ignore_errors=True)
         shutil.rmtree(os.path.join(data_dir, "dapp"), ignore_errors=True)
         shutil.rmtree(os.path.join(data_dir, "keystore"), ignore_errors=True)
         rm_file(os.path.join(data_dir, "nodekey"))
         rm_file(os.path.join(data_dir, "saved"))
 
-    def run_script(self, script):
+    def run_script(self, script, on_line=None, keep=None):
         if script == 'accounts.js':
             return subprocess.check_output([
                 self.geth,
                 "--networkid",
-                "123",
+                str(self.args.network_id),
                 "--nodiscover",
                 "--maxpeers",
                 "0",
+                "--port",
+                str(self.args.port),
                 "--datadir",
-                "./data",
+                self.data_dir,
                 "--verbosity",
                 "0",
                 "js",
-                script
+                self.work_path(script)
             ])
         else:
             print("Running '{}' script".format(script))
-            return subprocess.check_output([
+            self.start_node()
+            with self.timer.phase('script', os.path.splitext(script)[0]):
+                return self.node.run_script(
+                    self.work_path(script),
+                    on_line,
+                    self.args.watchdog,
+                    keep
+                )
+
+    def start_node(self):
+        """Start the node shared by all scripts of this run, if not running"""
+        if not self.node:
+            self.node = GethNode(
                 self.geth,
-                "--networkid",
-                "123",
-                "--nodiscover",
-                "--maxpeers",
-                "0",
-                "--genesis",
-                "./genesis_block.json",
-                "--datadir",
-                "./data",
-                "--verbosity",
-                "0",
-                "js",
-                script
-            ])
+                self.data_dir,
+                self.genesis_file,
+                network_id=self.args.network_id,
+                rpc_port=self.args.rpc_port,
+                port=self.args.port,
+                target_gas_limit=self.genesis_profile['gas_limit'],
+                init_genesis=self.args.mining == 'instant'
+            )
+        if not self.node.is_running():
+            with self.timer.phase('node_start'):
+                self.node.start()
+            with self.timer.phase('unlock'):
+                self.node.unlock_accounts(len(self.accounts), ACCOUNT_PASSWORD)
+
+    def stop_node(self):
+        if self.node:
+            self.node.stop()
 
-    def compile_contract(self, contract_path):
+    def run_solc(self, contract_path):
         print("    Compiling {}...".format(contract_path))
         data = subprocess.check_output([
             self.solc,
@@ -146,6 +320,18 @@ class TestContext():
         ])
         return json.loads(data)
 
+    def compile_contract(self, contract_path, keep_limits):
+        if not self.compile_cache:
+            return self.run_solc(contract_path)
+        return self.compile_cache.compile(
+            contract_path,
+            {
+                "keep_limits": keep_limits,
+                "child_sale_secs": self.args.child_sale_secs
+            },
+            self.run_solc
+        )
+
     def compile_contracts(self, keep_limits):
         if not self.solc:
             print("Error: No valid solc compiler provided")
@@ -156,27 +342,164 @@ class TestContext():
         if not os.path.isfile(dao_contract):
             print("DAO contract not found at {}".format(dao_contract))
             sys.exit(1)
-        dao_contract = edit_dao_source(
-            self.contracts_dir,
-            keep_limits
-        )
-
-        res = self.compile_contract(dao_contract)
+        # the edited sources and their imports go to a private directory,
+        # so that they never overwrite files of the same name in the cwd
+        sources_dir = tempfile.mkdtemp(prefix='dao-sources-')
+        try:
+            dao_contract = edit_dao_source(
+                self.contracts_dir,
+                keep_limits,
+                sources_dir,
+                self.args.child_sale_secs
+            )
+            res = self.compile_contract(dao_contract, keep_limits)
+        finally:
+            # also delete the temporary created files if solc failed
+            shutil.rmtree(sources_dir, ignore_errors=True)
         contract = res["contracts"]["DAO"]
         DAOCreator = res["contracts"]["DAO_Creator"]
         self.creator_abi = DAOCreator["abi"]
         self.creator_bin = DAOCreator["bin"]
         self.dao_abi = contract["abi"]
         self.dao_bin = contract["bin"]
+        managed_account = res["contracts"]["ManagedAccount"]
+        self.managed_account_abi = managed_account["abi"]
+        self.managed_account_bin = managed_account["bin"]
 
         offer = os.path.join(self.contracts_dir, "SampleOffer.sol")
-        res = self.compile_contract(offer)
+        res = self.compile_contract(offer, keep_limits)
         self.offer_abi = res["contracts"]["SampleOffer"]["abi"]
         self.offer_bin = res["contracts"]["SampleOffer"]["bin"]
+        self.write_artifacts()
 
-        # also delete the temporary created files
-        rm_file(os.path.join(self.contracts_dir, "DAOcopy.sol"))
-        rm_file(os.path.join(self.contracts_dir, "TokenSaleCopy.sol"))
+        if self.compile_cache:
+            self.compile_cache.report()
+
+    def write_artifacts(self):
+        """
+        Write the compiled contracts once into a script that all generated
+        scripts load, instead of inlining them into each one of them
+        """
+        with open(self.artifacts_file, 'w') as f:
+            f.write(js_artifacts([
+                ('dao', self.dao_abi, self.dao_bin),
+                ('creator', self.creator_abi, self.creator_bin),
+                ('offer', self.offer_abi, self.offer_bin),
+                (
+                    'managedAccount',
+                    self.managed_account_abi,
+                    self.managed_account_bin
+                ),
+            ]))
+
+    def run_scenario(
+            self,
+            name,
+            substitutions,
+            cb_before_creation=None,
+            expected_dict=None):
+        """
+        Play out a scenario on the selected backend and return the path of
+        the json-lines file its results were written to. For geth this
+        creates the js file from its template and runs it, checking the
+        results against `expected_dict` as they come in and aborting at the
+        first wrong one. Other arguments are the same as in
+        `create_js_file()`.
+        """
+        results_path = self.work_path('{}.results.jsonl'.format(name))
+        channel = ResultChannel(name, results_path, expected_dict)
+        if not self.backend:
+            with self.timer.phase('create_js', name):
+                self.create_js_file(name, substitutions, cb_before_creation)
+            output = self.run_script(
+                '{}.js'.format(name), channel.feed, channel.keep
+            )
+            if self.args.event_index and not channel.failed:
+                self.feed_index_results(name, channel)
+        else:
+            if cb_before_creation:
+                substitutions = cb_before_creation(self, name, substitutions)
+            print("Running '{}' scenario on the tester backend".format(name))
+            with self.timer.phase('script', name):
+                output = self.backend.run(name, substitutions)
+            lines = output.splitlines()
+            for line in lines:
+                channel.feed(line)
+            output = '\n'.join(l for l in lines if channel.keep(l))
+        channel.close()
+        if channel.failed:
+            print("Tests for scenario '{}' FAILED! Stopped at the first wrong "
+                  "result. Output was:\n{}".format(name, output))
+            sys.exit(1)
+        self.timer.record_output(name, output)
+        if self.gas_profile:
+            self.gas_profile.record(output)
+        if self.load_report and name == self.args.scenario:
+            self.load_report.record(output)
+        return results_path
+
+    def event_index_results(self, name):
+        """
+        The results of a scenario that are answered from the event index
+        instead of with a contract call per holder, as a dict of result name
+        to value. The templates leave these out when $from_index is true.
+        """
+        index = self.event_index
+        dao = self.dao_addr
+        if name == 'fund':
+            balances = index.balances(dao, self.accounts)
+            return {"balances": [b // WEI_PER_ETHER for b in balances]}
+        if name == 'proposals-load':
+            ids = index.proposal_ids(dao)
+            tallies = [
+                index.tally(dao, ids['Load proposal {}'.format(j)])
+                for j in range(self.args.proposals_num)
+            ]
+            return {
+                "proposal_yay": wei_strings([yea for yea, nay in tallies]),
+                "proposal_nay": wei_strings([nay for yea, nay in tallies]),
+                "balances_after": wei_strings(
+                    index.balances(dao, self.accounts)
+                )
+            }
+        if name == 'transfers-load':
+            return {
+                "balances": wei_strings(index.balances(dao, self.accounts))
+            }
+        return {}
+
+    def feed_index_results(self, name, channel):
+        """
+        Index the events of the blocks a scenario mined and feed the results
+        the index answers in place of the script into its result channel
+        """
+        if not self.event_index:
+            self.event_index = EventIndex(
+                self.args.event_index, self.node.rpc
+            )
+        with self.timer.phase('index', name):
+            count = self.event_index.update()
+            results = self.event_index_results(name)
+        print("Indexed {} events of scenario '{}'".format(count, name))
+        for key, value in sorted(results.iteritems()):
+            record = {
+                "key": key, "value": value, "time": ts_now(), "phase": "index"
+            }
+            if not channel.feed(RESULT_PREFIX + json.dumps(record)):
+                return
+
+    def evaluate(self, name, results_path, expected_dict):
+        """Evaluate the results of a scenario, see `eval_test()`"""
+        with self.timer.phase('evaluate', name):
+            return eval_test(name, results_path, expected_dict)
+
+    def wait_notice(self, period_name, secs):
+        if self.backend:
+            print("Notice: {} is {} seconds of chain time which will be "
+                  "skipped".format(period_name, secs))
+        else:
+            print("Notice: {} is {} seconds so the test will wait "
+                  "as much".format(period_name, secs))
 
     def create_js_file(self, name, substitutions, cb_before_creation=None):
         """
@@ -206,12 +529,22 @@ class TestContext():
         tmpl = Template(data)
         if cb_before_creation:
             substitutions = cb_before_creation(self, name, substitutions)
+        substitutions = dict(
+            substitutions,
+            from_index=json.dumps(bool(self.args.event_index))
+        )
         s = tmpl.substitute(substitutions)
-        write_js("{}.js".format(name), s, len(self.accounts))
+        write_js(
+            self.work_path("{}.js".format(name)),
+            s,
+            self.args.confirm_timeout,
+            self.artifacts_file,
+            self.tx_gas
+        )
 
     def run_test_deploy(self):
         print("Running the Deploy Test Scenario")
-        self.create_js_file(
+        results_path = self.run_scenario(
             'deploy',
             {
                 "dao_abi": self.dao_abi,
@@ -226,8 +559,7 @@ class TestContext():
             },
             calculate_closing_time
         )
-        output = self.run_script('deploy.js')
-        results = extract_test_dict('deploy', output)
+        results = read_results('deploy', results_path)
 
         try:
             self.dao_creator_addr = results['dao_creator_address']
@@ -236,25 +568,25 @@ class TestContext():
         except:
             print(
                 "ERROR: Could not find expected results in the deploy scenario"
-                ". The output was:\n{}".format(output)
+                ". The results were:\n{}".format(results)
             )
             sys.exit(1)
         print("DAO Creator address is: {}".format(self.dao_creator_addr))
         print("DAO address is: {}".format(self.dao_addr))
         print("SampleOffer address is: {}".format(self.offer_addr))
-        with open(self.save_file, "w") as f:
-            f.write(json.dumps({
-                "dao_creator_addr": self.dao_creator_addr,
-                "dao_addr": self.dao_addr,
-                "offer_addr": self.offer_addr,
-                "closing_time": self.closing_time
-            }))
+        if not self.backend:
+            # the in-memory chain does not outlive this run
+            with open(self.save_file, "w") as f:
+                f.write(json.dumps({
+                    "dao_creator_addr": self.dao_creator_addr,
+                    "dao_addr": self.dao_addr,
+                    "offer_addr": self.offer_addr,
+                    "closing_time": self.closing_time
+                }))
+        self.checkpoint('deploy')
 
     def run_test_fund(self):
-        # if deployment did not already happen do it now
-        if not self.dao_addr:
-            self.run_test_deploy()
-        else:
+        if 'deploy' not in self.played:
             print(
                 "WARNING: Running the funding scenario with a pre-deployed "
                 "DAO contract. Closing time is {} which is approximately {} "
@@ -267,46 +599,53 @@ class TestContext():
             )
 
         sale_secs = self.closing_time - ts_now()
-        self.total_supply = self.min_value + random.randint(1, 100)
+        self.total_supply = self.min_value + self.rng.randint(1, 100)
         self.token_amounts = constrained_sum_sample_pos(
-            len(self.accounts), self.total_supply
+            len(self.accounts), self.total_supply, self.rng
         )
-        self.create_js_file(
+        self.wait_notice("Funding period", sale_secs)
+        expected = {
+            "dao_funded": True,
+            "total_supply": self.total_supply,
+            "balances": self.token_amounts,
+            "user0_after": self.token_amounts[0],
+        }
+        results_path = self.run_scenario(
             'fund',
             {
                 "dao_abi": self.dao_abi,
                 "dao_address": self.dao_addr,
-                "wait_ms": (sale_secs-3)*1000,
+                "wait_secs": max(sale_secs - 3, 0),
                 "amounts": arr_str(self.token_amounts)
-            }
-        )
-        print(
-            "Notice: Funding period is {} seconds so the test will wait "
-            "as much".format(sale_secs)
+            },
+            expected_dict=expected
         )
-        output = self.run_script('fund.js')
-        eval_test('fund', output, {
-            "dao_funded": True,
-            "total_supply": self.total_supply,
-            "balances": self.token_amounts,
-            "user0_after": self.token_amounts[0],
-        })
+        self.evaluate('fund', results_path, expected)
+        self.checkpoint('fund')
 
     def run_test_proposal(self):
-        if not self.token_amounts:
-            # run the funding scenario first
-            self.run_test_fund()
-
         debate_secs = 20
         minamount = 2  # is determined by the total costs + one time costs
-        amount = random.randint(minamount, sum(self.token_amounts))
+        amount = self.rng.randint(minamount, sum(self.token_amounts))
         votes = create_votes_array(
             self.token_amounts,
-            not self.args.proposal_fail
+            not self.args.proposal_fail,
+            self.rng
         )
-        yay, nay = count_token_votes(self.token_amounts, votes)
+        yay, nay = tally_votes(self.token_amounts, votes)
         # self.create_proposal_js(amount, debate_secs, votes)
-        self.create_js_file(
+        self.wait_notice("Debate period", debate_secs)
+        expected = {
+            "dao_proposals_number": "1",
+            "proposal_passed": True,
+            "proposal_yay": yay,
+            "proposal_nay": nay,
+            "calculated_deposit": self.args.proposal_deposit,
+            "onetime_costs": self.args.offer_onetime_costs,
+            "deposit_returned": True,
+            "offer_promise_valid": True
+        }
+        results_path = self.run_scenario(
             'proposal',
             {
                 "dao_abi": self.dao_abi,
@@ -319,32 +658,42 @@ class TestContext():
                 "transaction_bytecode": '0x2ca15122',  # solc --hashes SampleOffer.sol
                 "debating_period": debate_secs,
                 "votes": arr_str(votes)
-            }
-        )
-        print(
-            "Notice: Debate period is {} seconds so the test will wait "
-            "as much".format(debate_secs)
+            },
+            expected_dict=expected
         )
-        output = self.run_script('proposal.js')
-        eval_test('proposal', output, {
-            "dao_proposals_number": "1",
-            "proposal_passed": True,
-            "proposal_yay": yay,
-            "proposal_nay": nay,
-            "calculated_deposit": self.args.proposal_deposit,
-            "onetime_costs": self.args.offer_onetime_costs,
-            "deposit_returned": True,
-            "offer_promise_valid": True
-        })
+        self.evaluate('proposal', results_path, expected)
         self.prop_id = 1
+        self.offer_amount = amount
+        self.checkpoint('proposal')
 
-    def run_test_rewards(self):
-        if not self.prop_id:
-            # run the proposal scenario first
-            self.run_test_proposal()
+    def total_reward_token(self):
+        """
+        `totalRewardToken` of the DAO. Only the offer's proposal created
+        reward tokens, the rewards of the donation all went to the reward
+        account.
+        """
+        if self.offer_amount is None:
+            print(
+                "ERROR: The amount of the offer's proposal is unknown. Was "
+                "the checkpoint saved by an older version of the framework?"
+            )
+            sys.exit(1)
+        return to_wei(self.offer_amount)
 
+    def run_test_rewards(self):
         debate_secs = 15
-        self.create_js_file(
+        self.wait_notice("Debate period", debate_secs)
+        reward_token = self.total_reward_token()
+        expected = {
+            "provider_reward_portion": wei_strings(rewards_for(
+                [to_wei(self.token_amounts[0])],
+                reward_token,
+                to_wei(self.total_supply),
+                to_wei(self.args.total_rewards),
+                reward_token
+            )[0])
+        }
+        results_path = self.run_scenario(
             'rewards',
             {
                 "dao_abi": self.dao_abi,
@@ -354,33 +703,31 @@ class TestContext():
                 "transaction_bytecode": '0x0',  # fallback function
                 "debating_period": debate_secs,
                 "prop_id": self.next_proposal_id()
-            }
-        )
-        print(
-            "Notice: Debate period is {} seconds so the test will wait "
-            "as much".format(debate_secs)
+            },
+            expected_dict=expected
         )
-        output = self.run_script('rewards.js')
-        results = eval_test('rewards', output, {
-            "provider_reward_portion": calculate_reward(
-                self.token_amounts[0],
-                self.total_supply,
-                self.args.total_rewards)
-        })
-        self.dao_balance_after_rewards = results['DAO_balance']
-        self.dao_rewardToken_after_rewards = results['DAO_rewardToken']
-
-    def prepare_test_split(self, split_gas):
-        if self.prop_id != 2:
-            # run the rewards scenario first
-            self.run_test_rewards()
+        results = self.evaluate('rewards', results_path, expected)
+        self.dao_balance_after_rewards = int(results['DAO_balance'])
+        self.dao_rewardToken_after_rewards = int(results['DAO_rewardToken'])
+        # a fork from the checkpoint may be run with another --total-rewards
+        self.reward_input_after_rewards = to_wei(self.args.total_rewards)
+        self.checkpoint('rewards')
 
+    def prepare_test_split(self, split_gas, expected_results):
+        """
+        Play out the split scenario and return its results file along with the
+        results expected from it, which `expected_results` calculates from
+        the votes of the users
+        """
         debate_secs = 15
         votes = create_votes_array(
             self.token_amounts,
-            not self.args.proposal_fail
+            not self.args.proposal_fail,
+            self.rng
         )
-        self.create_js_file(
+        self.wait_notice("Debate period", debate_secs)
+        expected = expected_results(votes)
+        results_path = self.run_scenario(
             'split',
             {
                 "dao_abi": self.dao_abi,
@@ -389,31 +736,34 @@ class TestContext():
                 "split_gas": split_gas,
                 "votes": arr_str(votes),
                 "prop_id": self.next_proposal_id()
-            }
-        )
-        print(
-            "Notice: Debate period is {} seconds so the test will wait "
-            "as much".format(debate_secs)
+            },
+            expected_dict=expected
         )
-        output = self.run_script('split.js')
-        return votes, output
+        return results_path, expected
 
     def run_test_split(self):
-        votes, output = self.prepare_test_split(4000000)
-        oldBalance, newBalance, oldDAORewards, newDAORewards = tokens_after_split(
-            votes,
-            self.token_amounts,
-            self.dao_balance_after_rewards,
-            self.dao_rewardToken_after_rewards
+        def expected_results(votes):
+            oldBalance, newBalance, oldDAORewards, newDAORewards = split_dao(
+                votes,
+                [to_wei(amount) for amount in self.token_amounts],
+                self.dao_balance_after_rewards,
+                self.dao_rewardToken_after_rewards
+            )
+            return {
+                # default deposit,a simple way to test new DAO contract got
+                # created
+                "newDAOProposalDeposit": 20,
+                "oldDAOBalance": wei_strings(oldBalance),
+                "newDAOBalance": wei_strings(newBalance),
+                "oldDaoRewardTokens": wei_strings(oldDAORewards),
+                "newDaoRewardTokens": wei_strings(newDAORewards),
+                "newDAOTotalSupply": wei_strings(sum(newBalance))
+            }
+        results_path, expected = self.prepare_test_split(
+            self.args.split_gas, expected_results
         )
-        eval_test('split', output, {
-            # default deposit,a simple way to test new DAO contract got created
-            "newDAOProposalDeposit": 20,
-            "oldDAOBalance": oldBalance,
-            "newDAOBalance": newBalance,
-            "oldDaoRewardTokens": oldDAORewards,
-            "newDaoRewardTokens": newDAORewards
-        })
+        self.evaluate('split', results_path, expected)
+        self.checkpoint('split')
 
     def run_test_split_insufficient_gas(self):
         """
@@ -424,31 +774,484 @@ class TestContext():
         This should happen with the latest homestead changes:
         https://github.com/ethereum/EIPs/blob/master/EIPS/eip-2.mediawiki#specification
         """
-        votes, output = self.prepare_test_split(1000)
-        oldBalance, newBalance, oldDAORewards, newDAORewards = tokens_after_split(
-            votes,
-            self.token_amounts,
-            self.dao_balance_after_rewards,
-            self.dao_rewardToken_after_rewards
+        def expected_results(votes):
+            return {
+                "newDAOProposalDeposit": 0,
+                "oldDAOBalance": wei_strings(
+                    [to_wei(amount) for amount in self.token_amounts]
+                ),
+                "newDAOBalance": wei_strings([0] * len(self.token_amounts)),
+            }
+        results_path, expected = self.prepare_test_split(
+            1000, expected_results
+        )
+        self.evaluate('split-insufficient-gas', results_path, expected)
+        self.checkpoint('split-insufficient-gas')
+
+    def run_test_proposals_load(self):
+        """
+        Keep --proposals-num proposals with different debating periods open
+        at once and have most holders vote on about two thirds of them. Voters
+        are blocked from transferring their tokens until the proposals they
+        voted on are executed.
+        """
+        num = self.args.proposals_num
+        base_secs = self.args.load_debate_secs
+        periods = [
+            base_secs + self.rng.randint(0, base_secs) for _ in range(num)
+        ]
+        # votes[j][i] is the vote of holder i on proposal j, None to abstain.
+        # About a quarter of the holders does not vote at all and so never
+        # gets blocked.
+        active = [self.rng.random() >= 0.25 for _ in self.accounts]
+        votes = [
+            [self.rng.choice([None, True, False]) if a else None
+             for a in active]
+            for _ in range(num)
+        ]
+        balances = [to_wei(amount) for amount in self.token_amounts]
+        min_quorum = to_wei(self.total_supply) // 5
+        yeas, nays, passed = [], [], []
+        for proposal_votes in votes:
+            yea, nay = tally_votes(
+                [b for b, v in zip(balances, proposal_votes) if v is not None],
+                [v for v in proposal_votes if v is not None]
+            )
+            yeas.append(yea)
+            nays.append(nay)
+            passed.append(yea + nay >= min_quorum and yea > nay)
+        voted = [
+            any(proposal_votes[i] is not None for proposal_votes in votes)
+            for i in range(len(self.accounts))
+        ]
+        self.wait_notice("Longest debating period", 2 * base_secs)
+        # every holder transfers one token unit while the proposals are open
+        # and one after they are executed. Only the first transfer of the
+        # voters is blocked.
+        expected = {
+            "opened_proposals": num,
+            "proposal_yay": wei_strings(yeas),
+            "proposal_nay": wei_strings(nays),
+            "blocked": voted,
+            "blocked_by_latest": True,
+            "balances_while_blocked": wei_strings([
+                b - (0 if v else 1) for b, v in zip(balances, voted)
+            ]),
+            "proposals_passed": passed,
+            "balances_after": wei_strings([
+                b - (1 if v else 2) for b, v in zip(balances, voted)
+            ])
+        }
+        results_path = self.run_scenario(
+            'proposals-load',
+            {
+                "dao_address": self.dao_addr,
+                "proposal_deposit": self.args.proposal_deposit,
+                "periods": json.dumps(periods),
+                "votes": json.dumps(votes)
+            },
+            expected_dict=expected
         )
-        eval_test('split-insufficient-gas', output, {
-            "newDAOProposalDeposit": 0,
-            "oldDAOBalance": self.token_amounts,
-            "newDAOBalance": [0] * len(self.token_amounts),
-        })
+        self.evaluate('proposals-load', results_path, expected)
+
+    def split_load_plan(self):
+        """
+        Plan the splits of the split-load scenario level by level. In every
+        level the holders of each DAO are shuffled and dealt into one group
+        per split proposal plus one that stays behind. The DAOs created in a
+        level are the ones split in the next.
+
+        Returns a list of levels, each a dict with the holders of every DAO
+        split in it as `parents` and with its `splits`. A split has the index
+        of the DAO it splits from, its `round` among the splits of that DAO,
+        the account indexes of its `voters` and of its new service provider.
+        """
+        proposals = self.args.split_proposals
+        parents = [range(len(self.accounts))]
+        # the new service provider has to differ from the current one
+        service_providers = [0]
+        levels = []
+        for level in range(self.args.split_levels):
+            splits = []
+            for parent, holders in enumerate(parents):
+                holders = list(holders)
+                self.rng.shuffle(holders)
+                size = len(holders) // (proposals + 1)
+                if size == 0:
+                    print("ERROR: The DAOs of split level {} have too few "
+                          "holders for {} split proposals each. Use more "
+                          "--users-num.".format(level + 1, proposals))
+                    sys.exit(1)
+                for j in range(proposals):
+                    voters = sorted(holders[j * size:(j + 1) * size])
+                    recipient = next(
+                        i for i in voters + range(len(self.accounts))
+                        if i != service_providers[parent]
+                    )
+                    splits.append({
+                        'parent': parent,
+                        'round': j,
+                        'voters': voters,
+                        'recipient': recipient
+                    })
+            levels.append({
+                'parents': [sorted(holders) for holders in parents],
+                'splits': splits
+            })
+            parents = [split['voters'] for split in splits]
+            service_providers = [split['recipient'] for split in splits]
+        return levels
+
+    def split_load_expectations(self, levels):
+        """
+        Results expected from playing out the splits of `split_load_plan()`.
+        The splits of a DAO are applied in the order of their rounds since
+        each one starts from what the previous ones left.
+        """
+        users = len(self.accounts)
+        # token balance of every account, ether and own reward tokens of the
+        # DAOs split in the current level
+        daos = [{
+            'balances': [to_wei(amount) for amount in self.token_amounts],
+            'eth': self.dao_balance_after_rewards,
+            'reward_token': self.dao_rewardToken_after_rewards
+        }]
+        expected = {}
+        for num, level in enumerate(levels, 1):
+            split_balance, split_supply, split_reward_token = [], [], []
+            children, child_reward_token = [], []
+            for split in level['splits']:
+                parent = daos[split['parent']]
+                votes = [i in split['voters'] for i in range(users)]
+                split_balance.append(parent['eth'])
+                split_supply.append(sum(parent['balances']))
+                split_reward_token.append(parent['reward_token'])
+                old, new, old_reward, new_reward = split_dao(
+                    votes,
+                    parent['balances'],
+                    parent['eth'],
+                    parent['reward_token']
+                )
+                parent['balances'] = old
+                parent['eth'] -= sum(new)
+                parent['reward_token'] = old_reward
+                # the new DAO sells its tokens 1:1 for the moved funds and
+                # its reward tokens are kept by the DAO it split from
+                children.append({
+                    'balances': new, 'eth': sum(new), 'reward_token': 0
+                })
+                child_reward_token.append(new_reward)
+            splits = level['splits']
+            prefix = 'level{}_'.format(num)
+            expected.update({
+                prefix + 'new_daos': len(splits),
+                prefix + 'split_balance': wei_strings(split_balance),
+                prefix + 'split_supply': wei_strings(split_supply),
+                prefix + 'split_reward_token': wei_strings(split_reward_token),
+                prefix + 'parent_balances': [
+                    wei_strings([dao['balances'][i] for i in holders])
+                    for dao, holders in zip(daos, level['parents'])
+                ],
+                prefix + 'parent_eth': wei_strings([d['eth'] for d in daos]),
+                prefix + 'parent_reward_token': wei_strings(
+                    [d['reward_token'] for d in daos]
+                ),
+                prefix + 'child_balances': [
+                    wei_strings([child['balances'][i] for i in s['voters']])
+                    for child, s in zip(children, splits)
+                ],
+                prefix + 'child_supply': wei_strings(
+                    [child['eth'] for child in children]
+                ),
+                prefix + 'child_reward_token': wei_strings(child_reward_token)
+            })
+            daos = children
+        return expected
+
+    def run_test_split_load(self):
+        """
+        Split the DAO through --split-proposals split proposals, each voted
+        for and executed by its own share of the holders, and split the DAOs
+        this creates again, for --split-levels levels. The funds, tokens and
+        reward tokens every split moves are checked against `split_dao()`
+        along with the split data the DAOs record.
+        """
+        debate_secs = self.args.load_debate_secs
+        levels = self.split_load_plan()
+        expected = self.split_load_expectations(levels)
+        self.wait_notice("Debate period of every split level", debate_secs)
+        if len(levels) > 1:
+            self.wait_notice(
+                "Token sale of the DAOs created by a split",
+                self.args.child_sale_secs
+            )
+        results_path = self.run_scenario(
+            'split-load',
+            {
+                "dao_address": self.dao_addr,
+                "debating_period": debate_secs,
+                "split_gas": self.args.split_gas,
+                "levels": json.dumps(levels)
+            },
+            expected_dict=expected
+        )
+        self.evaluate('split-load', results_path, expected)
+
+    def state_after_rewards(self):
+        """
+        Return the token balance and `paidOut` of every holder and the
+        accumulated input of the reward account, as the rewards scenario
+        left them
+        """
+        balances = [to_wei(amount) for amount in self.token_amounts]
+        accumulated_input = self.reward_input_after_rewards
+        # the service provider claimed its reward in the rewards scenario
+        paid_out = [0] * len(balances)
+        paid_out[0] = rewards_for(
+            [balances[0]],
+            self.dao_rewardToken_after_rewards,
+            to_wei(self.total_supply),
+            accumulated_input,
+            self.total_reward_token()
+        )[0]
+        return balances, paid_out, accumulated_input
+
+    def run_test_rewards_load(self):
+        """
+        Donate to the reward account --reward-rounds times. After every
+        donation about half of the holders withdraw their reward and about a
+        quarter transfer tokens, directly or through an allowance, which
+        moves their `paidOut` along. The payouts and balances of every round
+        are checked against the contract's arithmetic and the total paid out
+        against what the reward account received.
+        """
+        users = len(self.accounts)
+        total_reward_token = self.total_reward_token()
+        total_supply = to_wei(self.total_supply)
+        dao_reward_token = self.dao_rewardToken_after_rewards
+        balances, paid_out, accumulated_input = self.state_after_rewards()
+        rounds = []
+        expected = {}
+        for num in range(1, self.args.reward_rounds + 1):
+            donor = self.rng.randrange(users)
+            donation = to_wei(self.rng.randint(1, self.args.max_donation))
+            accumulated_input += donation
+            withdrawers = [i for i in range(users) if self.rng.random() < 0.5]
+            paid_out, failed = withdraw_rewards(
+                balances,
+                paid_out,
+                withdrawers,
+                dao_reward_token,
+                total_supply,
+                accumulated_input,
+                total_reward_token
+            )
+            # nobody both sends and receives in a round, so the transfers
+            # come out the same in whatever order they are included
+            holders = range(users)
+            self.rng.shuffle(holders)
+            senders, receivers = holders[:users // 2], holders[users // 2:]
+            transfers = []
+            for sender in sorted(senders):
+                if balances[sender] and self.rng.random() < 0.5:
+                    transfers.append([
+                        sender,
+                        self.rng.choice(receivers),
+                        self.rng.randint(1, balances[sender]),
+                        self.rng.random() < 0.5
+                    ])
+            balances, paid_out = transfer_tokens(
+                balances, paid_out, [t[:3] for t in transfers]
+            )
+            rounds.append({
+                'donor': donor,
+                'donation': str(donation),
+                'withdrawers': withdrawers,
+                # wei values are passed as strings to keep their precision
+                'transfers': [[s, r, str(v), a] for s, r, v, a in transfers]
+            })
+            prefix = 'round{}_'.format(num)
+            expected.update({
+                prefix + 'accumulated_input': wei_strings(accumulated_input),
+                prefix + 'withdrawals_failed': len(failed),
+                prefix + 'paid_out': wei_strings(paid_out),
+                prefix + 'total_paid_out': wei_strings(sum(paid_out)),
+                prefix + 'within_input': True,
+                prefix + 'balances': wei_strings(balances)
+            })
+        results_path = self.run_scenario(
+            'rewards-load',
+            {
+                "dao_address": self.dao_addr,
+                "allowance": total_supply,
+                "rounds": json.dumps(rounds)
+            },
+            expected_dict=expected
+        )
+        self.evaluate('rewards-load', results_path, expected)
+
+    def run_test_transfers_load(self):
+        """
+        Send --transfer-batches batches of transfers back to back. In every
+        batch half of the holders send a part of their tokens to the other
+        half, with a kind of transfer picked from `TRANSFER_MIX`. A quarter
+        of the holders votes on a proposal that stays open, so all their
+        transfers must fail. Balances and `paidOut` of every holder are
+        checked at the end.
+        """
+        users = len(self.accounts)
+        total_reward_token = self.total_reward_token()
+        total_supply = to_wei(self.total_supply)
+        balances, paid_out, accumulated_input = self.state_after_rewards()
+        voters = sorted(self.rng.sample(range(users), max(1, users // 4)))
+        votes = [[i, self.rng.random() < 0.5] for i in voters]
+        mix = []
+        for variant, weight in self.TRANSFER_MIX:
+            mix += [variant] * weight
+        batches = []
+        failed = 0
+        for _ in range(self.args.transfer_batches):
+            # nobody both sends and receives in a batch, so every sender's
+            # reward and transfer come out the same in any order
+            holders = range(users)
+            self.rng.shuffle(holders)
+            senders, receivers = holders[:users // 2], holders[users // 2:]
+            transfers = []
+            for sender in sorted(senders):
+                if balances[sender]:
+                    transfers.append([
+                        self.rng.choice(mix),
+                        sender,
+                        self.rng.choice(receivers),
+                        self.rng.randint(1, max(1, balances[sender] // 10))
+                    ])
+            allowed = [t for t in transfers if t[1] not in voters]
+            paid_out, failed_rewards = withdraw_rewards(
+                balances,
+                paid_out,
+                [t[1] for t in allowed if t[0].endswith('WithoutReward')],
+                self.dao_rewardToken_after_rewards,
+                total_supply,
+                accumulated_input,
+                total_reward_token
+            )
+            balances, paid_out = transfer_tokens(balances, paid_out, [
+                t[1:] for t in allowed if t[1] not in failed_rewards
+            ])
+            failed += len(transfers) - len(allowed) + len(failed_rewards)
+            # wei values are passed as strings to keep their precision
+            batches.append([[v, s, r, str(x)] for v, s, r, x in transfers])
+        expected = {
+            "blocked": [i in voters for i in range(users)],
+            "failed_transfers": failed,
+            "balances": wei_strings(balances),
+            "paid_out": wei_strings(paid_out)
+        }
+        results_path = self.run_scenario(
+            'transfers-load',
+            {
+                "dao_address": self.dao_addr,
+                "proposal_deposit": self.args.proposal_deposit,
+                # long enough for the proposal to stay open during the run
+                "debating_period": 2 * 7 * 24 * 3600,
+                "allowance": total_supply,
+                "votes": json.dumps(votes),
+                "batches": json.dumps(batches)
+            },
+            expected_dict=expected
+        )
+        self.evaluate('transfers-load', results_path, expected)
 
     def run_test_none(self):
         print("No test scenario provided.")
 
     def run_test(self, args):
-        if not self.geth:
+        if not self.geth and not self.backend:
             print("Error: No valid geth binary provided/found")
             sys.exit(1)
         # All scenarios would need to have the contracts compiled
-        self.compile_contracts(args.keep_limits)
-        self.test_scenarios[args.scenario]()
+        with self.timer.phase('compile'):
+            self.compile_contracts(args.keep_limits)
+        try:
+            self.run_with_dependencies(args.scenario)
+        finally:
+            self.stop_node()
+        if args.timings:
+            self.timer.report()
+            self.timer.write(args.timings)
+        if self.gas_profile:
+            self.report_gas_profile(args)
+        if self.load_report:
+            self.load_report.print_summary()
+            self.load_report.write(args.load_report)
+
+    def load_scale(self, args):
+        """
+        The scale a load scenario is played out at and the revision of the
+        contracts it ran against, for its report
+        """
+        scale = 'users={},contracts={}'.format(
+            args.users_num,
+            sources_revision(os.path.join(self.contracts_dir, 'DAO.sol'))
+        )
+        if args.scenario == 'proposals-load':
+            scale = 'proposals={},{}'.format(args.proposals_num, scale)
+        elif args.scenario == 'rewards-load':
+            scale = 'rounds={},{}'.format(args.reward_rounds, scale)
+        elif args.scenario == 'transfers-load':
+            scale = 'batches={},{}'.format(args.transfer_batches, scale)
+        elif args.scenario == 'split-load':
+            scale = 'split_proposals={},split_levels={},{}'.format(
+                args.split_proposals, args.split_levels, scale
+            )
+        return scale
+
+    def has_state_of(self, scenario):
+        """Whether the state a scenario produces is already there"""
+        fields = produced_state(scenario)
+        return fields and all(
+            getattr(self, field, None) is not None for field in fields
+        )
+
+    def run_with_dependencies(self, name):
+        """
+        Play out a scenario after the scenarios it builds on, leaving out
+        those whose state was loaded from a checkpoint or a saved file
+        """
+        for scenario in dependency_chain(name):
+            if scenario != name and self.has_state_of(scenario):
+                continue
+            self.test_scenarios[scenario]()
+            self.played.append(scenario)
+
+    def report_gas_profile(self, args):
+        self.gas_profile.print_summary()
+        self.gas_profile.write(args.gas_profile)
+        if not args.gas_baseline:
+            return
+        regressions = self.gas_profile.regressions(
+            args.gas_baseline, args.gas_threshold
+        )
+        if regressions:
+            print("ERROR: Gas usage regressed by more than {}% against "
+                  "{}:".format(args.gas_threshold, args.gas_baseline))
+            for regression in regressions:
+                print("  " + regression)
+            sys.exit(1)
+        print("Gas usage is within {}% of {}".format(
+            args.gas_threshold, args.gas_baseline
+        ))
 
 if __name__ == "__main__":
     args = test_args()
+    if args.scenarios:
+        sys.exit(run_scheduled(args, sys.argv[1:]))
+    if args.fuzz:
+        sys.exit(run_fuzz(args, sys.argv[1:]))
+    if args.fuzz_replay is not None:
+        apply_config(args, fuzz_config(
+            args.fuzz_replay, args.scenario, args.from_checkpoint
+        ))
+        args.seed = args.fuzz_replay
     ctx = TestContext(args)
     ctx.run_test(args)
@@ -0,0 +1,422 @@
+#!/usr/bin/python2
+"""
+In-process EVM backend for the test scenarios, built on pyethereum's tester
+module. It plays out the same scenarios as the javascript templates but the
+block timestamp is under the control of the harness, so the sale and the
+debating periods are skipped instantly instead of being waited out.
+"""
+import json
+import sys
+import time
+from decimal import Decimal
+from utils import ts_now
+
+try:
+    from ethereum import tester
+    from ethereum import utils as eth_utils
+    from ethereum.abi import ContractTranslator
+except ImportError:
+    tester = None
+
+WEI_PER_ETHER = 10 ** 18
+ZERO_ADDRESS = '0x' + '0' * 40
+# ether given to each of the accounts in the in-memory genesis
+ACCOUNT_BALANCE = 133700000000000000000000000000000000
+
+
+def to_wei(ether):
+    return int(ether) * WEI_PER_ETHER
+
+
+def from_wei(wei):
+    """Equivalent of web3.fromWei() returning a Decimal"""
+    return Decimal(wei) / WEI_PER_ETHER
+
+
+def hexaddr(addr):
+    if len(addr) == 20:
+        addr = addr.encode('hex')
+    if not addr.startswith('0x'):
+        addr = '0x' + addr
+    return addr
+
+
+def rawaddr(addr):
+    """Return the 20 byte form of an address as used by the tester state"""
+    if len(addr) == 20:
+        return addr
+    if addr.startswith('0x'):
+        addr = addr[2:]
+    return addr.decode('hex')
+
+
+class TesterBackend():
+    def __init__(self, accounts_num):
+        if tester is None:
+            print(
+                "Error: The tester backend needs pyethereum. Install it with "
+                "'pip install ethereum'"
+            )
+            sys.exit(1)
+        self.state = tester.state()
+        # blocks produced by the harness are timestamped from now on, so that
+        # all closing times and deadlines calculated by the framework hold
+        self.state.block.timestamp = ts_now()
+        self.state.block.gas_limit = 10 ** 9
+        self.keys = []
+        self.accounts = []
+        for i in range(accounts_num):
+            if i < len(tester.keys):
+                key = tester.keys[i]
+            else:
+                key = eth_utils.sha3('dao-test-account-{}'.format(i))
+            addr = eth_utils.privtoaddr(key)
+            self.state.block.set_balance(addr, ACCOUNT_BALANCE)
+            self.keys.append(key)
+            self.accounts.append(hexaddr(addr))
+        self.default_gas = tester.gas_limit
+        self.scenarios = {
+            'deploy': self.run_deploy,
+            'fund': self.run_fund,
+            'proposal': self.run_proposal,
+            'rewards': self.run_rewards,
+            'split': self.run_split,
+        }
+
+    def now(self):
+        return self.state.block.timestamp
+
+    def advance_to(self, timestamp):
+        """Mine the pending block and move chain time to `timestamp`"""
+        self.state.mine(1)
+        if timestamp > self.state.block.timestamp:
+            self.state.block.timestamp = timestamp
+
+    def check_work(self):
+        self.state.mine(3)
+
+    def contract(self, abi, address):
+        if not isinstance(abi, list):
+            abi = json.loads(abi)
+        return tester.ABIContract(self.state, abi, address)
+
+    def deploy(self, abi, bytecode, args, label, sender=0, gas=3000000):
+        if not isinstance(abi, list):
+            abi = json.loads(abi)
+        code = bytecode.decode('hex')
+        code += ContractTranslator(abi).encode_constructor_arguments(args)
+        address = self.transact(
+            lambda: self.state.evm(code, sender=self.keys[sender]), gas, label
+        )
+        if address is None:
+            return None
+        return self.contract(abi, address)
+
+    def transact(self, fn, gas=None, label='transaction'):
+        """
+        Apply a transaction, returning None if it failed. Failed transactions
+        are tolerated exactly like in the javascript scenarios, where the
+        expected values are checked afterwards.
+        """
+        tester.gas_limit = gas or self.default_gas
+        gas_before = self.state.block.gas_used
+        status = 'ok'
+        try:
+            return fn()
+        except Exception as e:
+            self.log("Transaction failed: {}".format(repr(e)))
+            status = 'failed'
+            return None
+        finally:
+            tester.gas_limit = self.default_gas
+            self.receipt(
+                label, self.state.block.gas_used - gas_before, status
+            )
+
+    def receipt(self, label, gas_used, status):
+        """Report a transaction like checkWork() does in the scripts"""
+        self.log("Receipt: " + json.dumps({
+            'label': label,
+            'hash': None,
+            'block': self.state.block.number,
+            'gasUsed': gas_used,
+            'status': status
+        }))
+
+    def send(self, sender, to, value, gas=None):
+        return self.transact(
+            lambda: self.state.send(self.keys[sender], rawaddr(to), value),
+            gas,
+            'fallback'
+        )
+
+    def balance(self, address):
+        return self.state.block.get_balance(rawaddr(address))
+
+    def log(self, msg):
+        self.output.append(msg)
+
+    def add_to_test(self, name, value):
+        self.test_map[name] = value
+        self.log("Result: " + json.dumps({
+            'key': name,
+            'value': value,
+            'time': time.time(),
+            'phase': 'tester'
+        }))
+
+    def run(self, name, substitutions):
+        """
+        Play out scenario `name` and return its output in the same format
+        as the one produced by the javascript scenario scripts
+        """
+        self.output = []
+        self.test_map = {}
+        self.scenarios[name](substitutions)
+        self.log("Result: " + json.dumps({
+            'complete': True,
+            'time': time.time()
+        }))
+        return '\n'.join(self.output)
+
+    def run_deploy(self, s):
+        sp = self.accounts[0]
+        creator = self.deploy(
+            s['creator_abi'], s['creator_bin'], [], 'DAO_Creator'
+        )
+        if creator is None:
+            self.log("DAOCreator was not mined!")
+            return
+        self.add_to_test('dao_creator_address', hexaddr(creator.address))
+        dao = self.deploy(
+            s['dao_abi'],
+            s['dao_bin'],
+            [sp, creator.address, s['min_value'], s['closing_time'], 0],
+            'DAO',
+            gas=4000000
+        )
+        offer = self.deploy(
+            s['offer_abi'],
+            s['offer_bin'],
+            [
+                sp,
+                '\0' * 32,
+                to_wei(s['offer_total']),
+                to_wei(s['offer_onetime']),
+                to_wei(1),
+                to_wei(1),
+                to_wei(1)
+            ],
+            'SampleOffer'
+        )
+        self.check_work()
+        if dao is not None:
+            self.add_to_test('dao_address', hexaddr(dao.address))
+        if offer is not None:
+            self.add_to_test('offer_address', hexaddr(offer.address))
+
+    def run_fund(self, s):
+        amounts = json.loads(s['amounts'])
+        dao = self.contract(s['dao_abi'], s['dao_address'])
+        self.log("Buying DAO tokens")
+        for i, amount in enumerate(amounts):
+            self.send(i, dao.address, to_wei(amount), gas=200000)
+        self.check_work()
+
+        self.log("Advancing chain time past the end of the sale")
+        self.advance_to(dao.closingTime() + 1)
+        self.add_to_test('dao_funded', dao.isFunded())
+        self.add_to_test('total_supply', dao.totalSupply() // WEI_PER_ETHER)
+        self.add_to_test('balances', [
+            dao.balanceOf(acc) // WEI_PER_ETHER for acc in self.accounts
+        ])
+
+        # now also try to purchase some extra tokens after the sale ended
+        self.send(0, dao.address, to_wei(20), gas=200000)
+        self.check_work()
+        self.add_to_test(
+            'user0_after', dao.balanceOf(self.accounts[0]) // WEI_PER_ETHER
+        )
+
+    def vote(self, dao, prop_id, votes):
+        for i, vote in enumerate(votes):
+            self.transact(
+                lambda: dao.vote(prop_id, vote, sender=self.keys[i]),
+                1000000,
+                'vote'
+            )
+        self.check_work()
+
+    def pass_deadline(self, dao, prop_id):
+        self.log("Advancing chain time past the debating period")
+        self.advance_to(dao.proposals(prop_id)[3] + 1)
+
+    def run_proposal(self, s):
+        dao = self.contract(s['dao_abi'], s['dao_address'])
+        offer = self.contract(s['offer_abi'], s['offer_address'])
+        sp = self.keys[0]
+        creator = self.accounts[1]
+        bytecode = s['transaction_bytecode'][2:].decode('hex')
+
+        self.log("Add offer contract as allowed recipient")
+        self.transact(
+            lambda: dao.addAllowedAddress(offer.address, sender=sp),
+            1000000,
+            'addAllowedAddress'
+        )
+        self.check_work()
+
+        creator_before = from_wei(self.balance(creator))
+        self.log("Creating a new proposal for {} ether.".format(
+            s['offer_amount']
+        ))
+        self.transact(lambda: dao.newProposal(
+            offer.address,
+            to_wei(s['offer_amount']),
+            s['offer_desc'],
+            bytecode,
+            s['debating_period'],
+            False,
+            sender=self.keys[1],
+            value=to_wei(s['proposal_deposit'])
+        ), 1000000, 'newProposal')
+        self.check_work()
+        self.add_to_test('calculated_deposit', int(round(
+            creator_before - from_wei(self.balance(creator))
+        )))
+        self.add_to_test('dao_proposals_number', str(dao.numberOfProposals()))
+
+        prop_id = 1
+        self.vote(dao, prop_id, json.loads(s['votes']))
+        proposal = dao.proposals(prop_id)
+        self.add_to_test('proposal_yay', proposal[9] // WEI_PER_ETHER)
+        self.add_to_test('proposal_nay', proposal[10] // WEI_PER_ETHER)
+        provider_before = from_wei(self.balance(self.accounts[0]))
+
+        self.pass_deadline(dao, prop_id)
+        self.log("Executing proposal ...")
+        self.transact(
+            lambda: dao.executeProposal(prop_id, bytecode, sender=sp),
+            1000000,
+            'executeProposal'
+        )
+        self.check_work()
+        self.add_to_test('proposal_passed', dao.proposals(prop_id)[5])
+        self.add_to_test('onetime_costs', int(round(
+            from_wei(self.balance(self.accounts[0])) - provider_before
+        )))
+        self.add_to_test(
+            'deposit_returned',
+            round(from_wei(self.balance(creator))) == round(creator_before)
+        )
+        self.add_to_test('offer_promise_valid', offer.promiseValid())
+
+    def run_rewards(self, s):
+        dao = self.contract(s['dao_abi'], s['dao_address'])
+        sp = self.accounts[0]
+
+        self.log("Donating to DAO...")
+        self.transact(lambda: dao.payDAO(
+            sender=self.keys[1], value=to_wei(s['total_rewards'])
+        ), 100000, 'payDAO')
+        self.check_work()
+
+        self.log("Creating proposal to send to rewardAccount...")
+        self.transact(lambda: dao.newProposal(
+            dao.rewardAccount(),
+            to_wei(s['total_rewards']),
+            'Send money to the reward account',
+            '',
+            s['debating_period'],
+            False,
+            sender=self.keys[1],
+            value=to_wei(s['proposal_deposit'])
+        ), 1000000, 'newProposal')
+        self.check_work()
+
+        prop_id = s['prop_id']
+        self.vote(dao, prop_id, [True] * len(self.accounts))
+        self.pass_deadline(dao, prop_id)
+        self.log("Executing the proposal...")
+        self.transact(
+            lambda: dao.executeProposal(prop_id, '', sender=self.keys[0]),
+            1000000,
+            'executeProposal'
+        )
+        self.check_work()
+        self.log("Claiming the reward...")
+        self.transact(
+            lambda: dao.getMyReward(sender=self.keys[0]),
+            1000000,
+            'getMyReward'
+        )
+        self.check_work()
+        self.add_to_test('provider_reward_portion', str(dao.paidOut(sp)))
+        self.add_to_test('DAO_balance', str(self.balance(dao.address)))
+        self.add_to_test('DAO_rewardToken', str(dao.rewardToken(dao.address)))
+
+    def run_split(self, s):
+        dao = self.contract(s['dao_abi'], s['dao_address'])
+        new_sp = self.accounts[1]
+
+        self.log("Creating proposal to change SP...")
+        self.transact(lambda: dao.newProposal(
+            new_sp,
+            0,
+            'Changing SP to eth.accounts[1]',
+            '',
+            s['debating_period'],
+            True,
+            sender=self.keys[1]
+        ), 1000000, 'newProposal')
+        self.check_work()
+
+        votes = json.loads(s['votes'])
+        prop_id = s['prop_id']
+        self.vote(dao, prop_id, votes)
+        proposal = dao.proposals(prop_id)
+        self.add_to_test('proposal_yay', proposal[9] // WEI_PER_ETHER)
+        self.add_to_test('proposal_nay', proposal[10] // WEI_PER_ETHER)
+
+        self.pass_deadline(dao, prop_id)
+        self.log("Executing the split proposal...")
+        for i, vote in enumerate(votes):
+            if vote:
+                self.transact(
+                    lambda: dao.splitDAO(prop_id, new_sp, sender=self.keys[i]),
+                    s['split_gas'],
+                    'splitDAO'
+                )
+        self.check_work()
+        self.log("After split execution")
+        self.add_to_test('proposal_passed', dao.proposals(prop_id)[5])
+        new_addr = hexaddr(dao.splitProposalNewAddress(prop_id, 0))
+        self.add_to_test('proposal_newdao', new_addr)
+
+        if new_addr == ZERO_ADDRESS:
+            # no DAO got created, so there is nothing to query in the new DAO
+            newdao = None
+        else:
+            newdao = self.contract(s['dao_abi'], new_addr)
+
+        def new_dao_value(fn):
+            return fn(newdao) if newdao else 0
+        self.add_to_test('oldDAOBalance', [
+            str(dao.balanceOf(acc)) for acc in self.accounts
+        ])
+        self.add_to_test('newDAOBalance', [
+            str(new_dao_value(lambda d: d.balanceOf(acc)))
+            for acc in self.accounts
+        ])
+        self.add_to_test('oldDaoRewardTokens', str(
+            dao.rewardToken(dao.address)
+        ))
+        self.add_to_test('newDaoRewardTokens', str(
+            dao.rewardToken(new_addr)
+        ))
+        self.add_to_test('newDAOTotalSupply', str(new_dao_value(
+            lambda d: d.totalSupply()
+        )))
+        self.add_to_test('newDAOProposalDeposit', new_dao_value(
+            lambda d: d.proposalDeposit()
+        ) // WEI_PER_ETHER)
@@ -0,0 +1,97 @@
+#!/usr/bin/python2
+import json
+import time
+from contextlib import contextmanager
+
+TIMING_PREFIX = 'Timing: '
+
+
+def parse_timings(output):
+    """Return the on-chain phase timings reported by a scenario's script"""
+    timings = []
+    for line in output.splitlines():
+        if line.startswith(TIMING_PREFIX):
+            timings.append(json.loads(line[len(TIMING_PREFIX):]))
+    return timings
+
+
+def percentile(values, pct):
+    """Linearly interpolated percentile of a list of numbers"""
+    values = sorted(values)
+    if not values:
+        return None
+    pos = (len(values) - 1) * pct / 100.0
+    low = int(pos)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (pos - low)
+
+
+class PhaseTimer():
+    """
+    Records how long each phase of a test run takes. Harness phases are
+    timed with `phase()` while the on-chain phases (unlocking, confirming
+    transactions, waiting for deadlines) are reported by the scripts and
+    added with `record_output()`. Phases of a script therefore overlap with
+    the `script` phase that ran it.
+    """
+    def __init__(self):
+        self.start = time.time()
+        self.records = []
+
+    @contextmanager
+    def phase(self, name, scenario=None):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add(name, time.time() - start, scenario)
+
+    def add(self, name, secs, scenario=None, blocks=None):
+        self.records.append({
+            'phase': name,
+            'scenario': scenario,
+            'secs': secs,
+            'blocks': blocks
+        })
+
+    def record_output(self, scenario, output):
+        for timing in parse_timings(output):
+            self.add(
+                timing['phase'], timing['secs'], scenario, timing.get('blocks')
+            )
+
+    def totals(self):
+        """Return a dict of phase name to (count, total seconds, blocks)"""
+        result = {}
+        for record in self.records:
+            count, secs, blocks = result.get(record['phase'], (0, 0.0, 0))
+            result[record['phase']] = (
+                count + 1,
+                secs + record['secs'],
+                blocks + (record['blocks'] or 0)
+            )
+        return result
+
+    def report(self):
+        total = time.time() - self.start
+        print("\n{:<16} {:>6} {:>10} {:>8} {:>8}".format(
+            "Phase", "Count", "Seconds", "Share", "Blocks"
+        ))
+        totals = self.totals()
+        for name in sorted(totals, key=lambda n: -totals[n][1]):
+            count, secs, blocks = totals[name]
+            print("{:<16} {:>6} {:>10.2f} {:>7.1f}% {:>8}".format(
+                name,
+                count,
+                secs,
+                secs * 100 / total if total else 0,
+                blocks or ''
+            ))
+        print("Total run time: {:.2f} seconds".format(total))
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            f.write(json.dumps({
+                'total_secs': time.time() - self.start,
+                'phases': self.records
+            }, indent=4))
@@ -5,15 +5,33 @@ import os
 import json
 import sys
 import math
+import shutil
 from datetime import datetime
 from jsutils import js_common_intro
 
-
-def constrained_sum_sample_pos(n, total):
+# Parameters of the genesis block. A profile given as a json file overrides
+# the values of the default one. `config` is the chain configuration of
+# geth versions that support one and is left out when empty.
+GENESIS_PROFILES = {
+    'default': {
+        'gas_limit': 0x47e7c4,
+        'difficulty': 1,
+        'balance': 133700000000000000000000000000000000,
+        'config': None
+    },
+    # room for a few hundred funding or voting transactions per block
+    'large': {
+        'gas_limit': 500000000
+    }
+}
+
+
+def constrained_sum_sample_pos(n, total, rng=random):
     """Return a randomly chosen list of n positive integers summing to total.
-    Each such list is equally likely to occur."""
+    Each such list is equally likely to occur. `rng` is the random generator
+    to draw from."""
 
-    dividers = sorted(random.sample(xrange(1, total), n - 1))
+    dividers = sorted(rng.sample(xrange(1, total), n - 1))
     return [a - b for a, b in zip(dividers + [total], [0] + dividers)]
 
 
@@ -65,27 +83,30 @@ def seconds_in_future(secs):
     return ts_now() + secs
 
 
-def create_votes_array(amounts, succeed):
-    votes = []
+def create_votes_array(amounts, succeed, rng=None):
+    """Return the votes of the token holders, such that the vote succeeds or
+    fails as requested. Holders cast their votes in order, or in a random
+    order drawn from `rng` if given, so that different holders end up in the
+    majority."""
+    votes = [False] * len(amounts)
     total = sum(amounts)
     percentage = 0.0
+    order = range(len(amounts))
+    if rng:
+        rng.shuffle(order)
 
     if not succeed:
-        for val in amounts:
-            ratio = val/float(total)
+        for idx in order:
+            ratio = amounts[idx]/float(total)
             if (percentage + ratio < 0.5):
-                votes.append(True)
+                votes[idx] = True
                 percentage += ratio
-            else:
-                votes.append(False)
     else:
-        for val in amounts:
-            ratio = val/float(total)
+        for idx in order:
+            ratio = amounts[idx]/float(total)
             if percentage <= 0.5:
-                votes.append(True)
+                votes[idx] = True
                 percentage += ratio
-            else:
-                votes.append(False)
 
     return votes
 
@@ -94,23 +115,34 @@ def arr_str(arr):
     return '[ ' + ', '.join([str(x).lower() for x in arr]) + ' ]'
 
 
-def extract_test_dict(name, output):
-    split = output.split('Test Results: ', 1)
-    if len(split) != 2:
-        print("ERROR: Could not parse '{}' output properly.\n"
-              "Output was:\n{}".format(
-                  name, output
-              ))
-        sys.exit(1)
+RESULT_PREFIX = 'Result: '
+
+
+def read_results(name, path):
+    """
+    Read the result records a scenario wrote to its json-lines results file
+    one at a time and return a dict of all the results
+    """
+    results = {}
+    complete = False
     try:
-        result = json.loads(split[1])
-    except:
-        print("ERROR: Could not parse '{}' output properly.\n"
-              "Output was:\n{}".format(
-                  name, output
-              ))
+        with open(path, 'r') as f:
+            for line in f:
+                record = json.loads(line)
+                if record.get('complete'):
+                    complete = True
+                else:
+                    results[record['key']] = record['value']
+    except (IOError, ValueError) as e:
+        print("ERROR: Could not read the results of '{}' from {}: {}".format(
+            name, path, e
+        ))
+        sys.exit(1)
+    if not complete:
+        print("ERROR: The '{}' scenario did not run to completion. Results "
+              "are in {}".format(name, path))
         sys.exit(1)
-    return result
+    return results
 
 
 def compare_values(a, b):
@@ -123,7 +155,59 @@ def compare_values(a, b):
         return a == b
 
 
-def eval_test(name, output, expected_dict):
+class ResultChannel():
+    """
+    Receives the output of a scenario line by line. Result records are
+    written to a json-lines file as they arrive, instead of being kept in
+    the output, and are compared with the expected results on the way, so
+    that a wrong value fails the scenario right away instead of after the
+    rest of it has been played out. Other lines are echoed.
+    """
+    # machine readable lines that are not echoed while a script runs
+    QUIET_PREFIXES = ('Receipt: ', 'Timing: ', 'Phase: ', 'Throughput: ')
+
+    def __init__(self, name, path, expected_dict=None):
+        self.name = name
+        self.path = path
+        self.expected_dict = expected_dict or {}
+        self.failed = False
+        self.f = open(path, 'w')
+
+    def keep(self, line):
+        """Whether a line belongs in the script output kept in memory"""
+        return not line.startswith(RESULT_PREFIX)
+
+    def feed(self, line):
+        """Handle an output line, returning False on a wrong result"""
+        if not line.startswith(RESULT_PREFIX):
+            if not line.startswith(self.QUIET_PREFIXES):
+                print("    {}".format(line))
+            return True
+        record = json.loads(line[len(RESULT_PREFIX):])
+        record['scenario'] = self.name
+        self.f.write(json.dumps(record) + '\n')
+        self.f.flush()
+        if record.get('complete'):
+            return True
+        key = record['key']
+        value = json.dumps(record['value'])
+        if len(value) > 200:
+            value = value[:200] + ' ...'
+        print("    '{}' = {}".format(key, value))
+        if key in self.expected_dict and not compare_values(
+                record['value'], self.expected_dict[key]):
+            print("ERROR: Expected {} for '{}' but got {}".format(
+                self.expected_dict[key], key, record['value']
+            ))
+            self.failed = True
+            return False
+        return True
+
+    def close(self):
+        self.f.close()
+
+
+def eval_test(name, results_path, expected_dict):
     """
     Evaluate output of a scenario and compare with expected results
         Parameters
@@ -131,9 +215,9 @@ def eval_test(name, output, expected_dict):
         name : string
         The name of the scenario to evaluate
 
-        output : string
-        The output of the script that was executed, from which we will
-        extract the results
+        results_path : string
+        The json-lines file the result records of the scenario were written
+        to, from which we will read the results
 
         expected_dict : dict
         A dictionary containing all the expected output from the test
@@ -144,7 +228,7 @@ def eval_test(name, output, expected_dict):
         The dictionary that resulted from the parsing of the test output
     """
     tests_fail = False
-    results = extract_test_dict(name, output)
+    results = read_results(name, results_path)
 
     for k, v in expected_dict.iteritems():
         if k not in results:
@@ -160,21 +244,76 @@ def eval_test(name, output, expected_dict):
     if not tests_fail:
         print("Tests for scenario '{}' PASSED!".format(name))
     else:
-        print("Tests for scenario '{}' FAILED! Script output was:\n{}".format(
-            name, output)
+        print("Tests for scenario '{}' FAILED! Results are in {}".format(
+            name, results_path)
         )
         sys.exit(1)
     return results
 
 
-def write_js(name, contents, accounts_num):
+def write_js(name, contents, confirm_timeout, artifacts=None, tx_gas=None):
     """Write a javascript file from a template, prepending common intro"""
     with open(name, "w") as f:
-            f.write("{}\n{}".format(js_common_intro(accounts_num), contents))
+            f.write("{}\n{}".format(
+                js_common_intro(confirm_timeout, artifacts, tx_gas),
+                contents
+            ))
+
+
+def load_genesis_profile(name_or_path):
+    """
+    Return the genesis profile with the given name, or the default profile
+    updated with the contents of the given json file
+    """
+    profile = dict(GENESIS_PROFILES['default'])
+    if name_or_path in GENESIS_PROFILES:
+        profile.update(GENESIS_PROFILES[name_or_path])
+        return profile
+    if not os.path.isfile(name_or_path):
+        print("ERROR: Unknown genesis profile '{}'. Give one of {} or a json "
+              "file".format(name_or_path, ', '.join(sorted(GENESIS_PROFILES))))
+        sys.exit(1)
+    with open(name_or_path, 'r') as f:
+        profile.update(json.loads(f.read()))
+    return profile
 
 
-def create_genesis(accounts):
-    """Create a genesis block with ether allocation for the given accounts"""
+def instant_seal_profile(profile, signer, network_id):
+    """
+    Return a copy of a genesis profile for a clique chain with a period of
+    0, on which `signer` seals a block as soon as there are transactions
+    pending. No ethash cache or DAG is ever generated for such a chain.
+    """
+    profile = dict(profile)
+    config = dict(profile.get('config') or {})
+    config.update({
+        'chainId': network_id,
+        'homesteadBlock': 0,
+        'clique': {'period': 0, 'epoch': 30000}
+    })
+    profile['config'] = config
+    # vanity, the initial signers and an empty seal
+    profile['extra_data'] = '0x' + '00' * 32 + signer[2:] + '00' * 65
+    return profile
+
+
+def create_genesis(accounts, path, profile=None):
+    """
+    Create a genesis block with ether allocation for the given accounts
+
+    Parameters
+    ----------
+    accounts : list
+    The addresses of the accounts to prefund
+
+    path : string
+    The file to write the genesis block to
+
+    profile : dict
+    (Optional) The genesis parameters, see `GENESIS_PROFILES`. Defaults to
+    the default profile.
+    """
+    profile = profile or GENESIS_PROFILES['default']
     genesis = {}
     genesis["nonce"] = "0xdeadbeefdeadbeef"
     genesis["timestamp"] = "0x0"
@@ -182,46 +321,41 @@ def create_genesis(accounts):
     genesis["parentHash"] = (
         "0x0000000000000000000000000000000000000000000000000000000000000000"
     )
-    genesis["extraData"] = "0x0"
-    genesis["gasLimit"] = "0x47e7c4"
-    genesis["difficulty"] = (
-        "0x0000000000000000000000000000000000000000000000000000000000000001"
-    )
+    genesis["extraData"] = profile.get('extra_data', "0x0")
+    genesis["gasLimit"] = hex(profile['gas_limit']).rstrip('L')
+    genesis["difficulty"] = "0x{:064x}".format(profile['difficulty'])
     genesis["mixhash"] = (
         "0x0000000000000000000000000000000000000000000000000000000000000000"
     )
+    if profile.get('config'):
+        genesis["config"] = profile['config']
     alloc = {}
     for acc in accounts:
-        alloc[acc] = {"balance": "133700000000000000000000000000000000"}
+        alloc[acc] = {"balance": str(profile['balance'])}
     genesis["alloc"] = alloc
-    with open('genesis_block.json', "w") as f:
+    with open(path, "w") as f:
         f.write(json.dumps(genesis))
 
 
-def count_token_votes(amounts, votes):
-    """Returns how many tokens votes yay and how many voted nay"""
-    yay = 0
-    nay = 0
-    for idx, amount in enumerate(amounts):
-        if votes[idx]:
-            yay += amount
-        else:
-            nay += amount
-    return yay, nay
-
-
-def calculate_reward(tokens, total_tokens, total_rewards):
-    result = (tokens * float(total_rewards)) / float(total_tokens)
-    return result
-
-
 def calculate_closing_time(obj, script_name, substitutions):
     obj.closing_time = seconds_in_future(obj.args.closing_time)
     substitutions['closing_time'] = obj.closing_time
     return substitutions
 
 
-def edit_dao_source(contracts_dir, keep_limits):
+# Unedited sources the edited DAO copy imports, which need to sit next to it
+EDITED_DAO_IMPORTS = ['Token.sol', 'ManagedAccount.sol']
+
+
+def edit_dao_source(contracts_dir, keep_limits, out_dir=None,
+                    child_sale_secs=None):
+    """
+    Create edited copies of the DAO and TokenSale sources in `out_dir`
+    (defaults to `contracts_dir`) and return the path of the DAO copy. If
+    `child_sale_secs` is given the token sale of the DAOs created by splits
+    ends after that many seconds instead of 42 days.
+    """
+    out_dir = out_dir or contracts_dir
     with open(os.path.join(contracts_dir, 'DAO.sol'), 'r') as f:
         contents = f.read()
 
@@ -231,6 +365,10 @@ def edit_dao_source(contracts_dir, keep_limits):
         contents = contents.replace(" || (_debatingPeriod < 2 weeks)", "")
         contents = contents.replace("|| now > p.votingDeadline + 41 days", "")
         contents = contents.replace("now < closingTime + 40 days", "true")
+    if child_sale_secs:
+        contents = contents.replace(
+            "now + 42 days", "now + {} seconds".format(child_sale_secs)
+        )
 
     # add test query functions
     contents = contents.replace(
@@ -271,7 +409,7 @@ def edit_dao_source(contracts_dir, keep_limits):
         'import "./TokenSaleCopy.sol";'
     )
 
-    new_path = os.path.join(contracts_dir, "DAOcopy.sol")
+    new_path = os.path.join(out_dir, "DAOcopy.sol")
     with open(new_path, "w") as f:
         f.write(contents)
 
@@ -280,63 +418,11 @@ def edit_dao_source(contracts_dir, keep_limits):
         contents = f.read()
     if not keep_limits:
         contents = contents.replace('closingTime - 2 weeks > now', 'true')
-    with open(os.path.join(contracts_dir, 'TokenSaleCopy.sol'), "w") as f:
+    with open(os.path.join(out_dir, 'TokenSaleCopy.sol'), "w") as f:
         f.write(contents)
 
-    return new_path
-
-
-def tokens_after_split(votes, original_balance, dao_balance, reward_tokens):
-    """
-    Create expected token and reward token results after the split scenario
-        Parameters
-        ----------
-        votes : array of booleans
-        The votes array of what each user voted
-
-        original_balance : array of ints
-        The original amount of tokens each user had before the split
-
-        dao_balance : int
-        The balance of ether left in the DAO before the scenario started
-
-        reward_tokens : float
-        Amount of reward tokens generated in the DAO before the scenario.
-
-        Returns
-        ----------
-        old_dao_balance : array of ints
-        The balance of tokens left in the old dao.
-
-        new_dao_balance : array of ints
-        The balance of tokens left in the new dao.
+    if os.path.realpath(out_dir) != os.path.realpath(contracts_dir):
+        for name in EDITED_DAO_IMPORTS:
+            shutil.copy2(os.path.join(contracts_dir, name), out_dir)
 
-        old_reward_tokens : float
-        The amount of reward tokens left in the old dao.
-
-        new_reward_tokens : float
-        The amount of reward tokens left in the new dao.
-    """
-
-    old_dao_balance = []
-    new_dao_balance = []
-    totalSupply = sum(original_balance)
-    old_reward_tokens = reward_tokens
-    new_reward_tokens = 0
-
-    for vote, orig in zip(votes, original_balance):
-        if vote:
-            new_dao_balance.append(orig * dao_balance / totalSupply)
-            old_dao_balance.append(0)
-            rewardToMove = float(orig) * reward_tokens / float(totalSupply)
-            old_reward_tokens -= float(rewardToMove)
-            new_reward_tokens += float(rewardToMove)
-        else:
-            old_dao_balance.append(orig)
-            new_dao_balance.append(0)
-    return (
-        old_dao_balance,
-        new_dao_balance,
-        old_reward_tokens,
-        new_reward_tokens
-    )
+    return new_path